@@ -1,9 +1,8 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
-from datetime import datetime
 
-from server.db.session import get_db
+from server.db.session import get_async_db, get_async_read_db, record_write
 from server.models.pydantic_models import (
     UploadRequest,
     TaskResponse,
@@ -11,58 +10,10 @@ from server.models.pydantic_models import (
 )
 from server.models.server_models import APIRequest
 from server.constants.status import TaskStatus
-from server.services.upload_service import process_csv_from_url
+from server.services.job_queue import lease_expired, notify_job_available
 
 router = APIRouter()
 
-
-async def process_csv_background(
-        task_id: str,
-        file_url: str,
-        db: Session
-):
-    task = db.query(APIRequest).filter(APIRequest.id == task_id).first()
-    if not task:
-        return
-
-    task.status = TaskStatus.PROCESSING
-    db.commit()
-
-    try:
-        # Your existing process_csv_from_url logic here
-        rows_processed_successfully, rows_could_not_be_processed, errors = await process_csv_from_url(file_url, db)
-
-        result = {
-            "rows_processed_successfully": rows_processed_successfully,
-            "rows_could_not_be_processed": rows_could_not_be_processed,
-            "errors": errors
-        }
-
-        if rows_processed_successfully == 0:
-            task_status = TaskStatus.FAILED
-            message = "CSV file could not be processed"
-        elif rows_could_not_be_processed > 0:
-            task_status = TaskStatus.PARTIALLY_COMPLETED
-            message = "Not all rows could be processed successfully"
-        else:
-            task_status = TaskStatus.COMPLETED
-            message = "CSV file processed successfully"
-
-        task.status = task_status
-        task.result = {
-            "message": message,
-            **result
-        }
-        task.completed_at = datetime.now()
-        db.commit()
-
-    except Exception as e:
-        task.status = TaskStatus.FAILED
-        task.error = str(e)
-        task.completed_at = datetime.now()
-        db.commit()
-
-
 @router.post(
     "/upload_data_async",
     response_model=TaskResponse,
@@ -72,30 +23,65 @@ async def process_csv_background(
 )
 async def upload_data_async(
         request: UploadRequest,
-        background_tasks: BackgroundTasks,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     task_id = str(uuid.uuid4())
 
-    # Create task record
+    # The task record is the queued job, an ingest worker claims it
     task = APIRequest(
         id=task_id,
-        status=TaskStatus.PENDING
+        status=TaskStatus.PENDING,
+        file_url=str(request.file_url),
+        incremental=request.incremental
     )
     db.add(task)
-    db.commit()
+    await db.commit()
+    record_write()
+    notify_job_available()
 
-    # Add to background tasks
-    background_tasks.add_task(
-        process_csv_background,
+    return TaskResponse(
         task_id=task_id,
-        file_url=str(request.file_url),
-        db=db
+        message="Added Request to Queue with ID: " + task_id
     )
 
+
+@router.post(
+    "/upload_data_async/resume",
+    response_model=TaskResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Resume Async Upload",
+    description="Resume a failed or interrupted async upload from its last committed row"
+)
+async def resume_upload_async(
+        task_id: str = Query(...),
+        db: AsyncSession = Depends(get_async_db)
+):
+    task = await db.get(APIRequest, task_id)
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+
+    interrupted = task.status == TaskStatus.PROCESSING and lease_expired(task)
+    if not task.file_url or (task.status != TaskStatus.FAILED and not interrupted):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Only failed or interrupted tasks can be resumed"
+        )
+
+    task.status = TaskStatus.PENDING
+    task.error = None
+    task.completed_at = None
+    task.worker_id = None
+    task.attempts = 0
+    await db.commit()
+    record_write()
+    notify_job_available()
+
     return TaskResponse(
         task_id=task_id,
-        message="Added Request to Queue with ID: " + task_id
+        message=f"Resuming task {task_id} after row {task.rows_committed}"
     )
 
 
@@ -108,9 +94,9 @@ async def upload_data_async(
 )
 async def get_task_status(
         task_id: str = Query(...),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_read_db)
 ):
-    task = db.query(APIRequest).filter(APIRequest.id == task_id).first()
+    task = await db.get(APIRequest, task_id)
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -122,6 +108,7 @@ async def get_task_status(
         status=task.status,
         message=task.result.get("message") if task.result else None,
         result=task.result,
+        progress=task.progress,
         created_at=task.created_at,
         completed_at=task.completed_at
     )
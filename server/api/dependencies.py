@@ -0,0 +1,86 @@
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import HTTPException, Query
+from server.models.pydantic_models import FieldParams, FilterParams
+from server.services.game_service import response_fields
+
+# Query parameters shared by the endpoints selecting games
+
+
+async def filter_params(
+    search: Optional[str] = Query(None, description="full text search of name and about_the_game"),
+    name: Optional[str] = Query(None),
+    about_the_game: Optional[str] = Query(None),
+    developers: Optional[List[str]] = Query(None),
+    publishers: Optional[List[str]] = Query(None),
+    categories: Optional[List[str]] = Query(None),
+    supported_languages: Optional[List[str]] = Query(None),
+    genres: Optional[List[str]] = Query(None),
+    tags: Optional[List[str]] = Query(None),
+    platforms: Optional[List[str]] = Query(None),
+    match: Literal['exact', 'prefix', 'contains'] = Query(
+        'contains', description="how developers, publishers, categories, languages, genres and tags values match names"
+    ),
+    release_date: Optional[date] = Query(None),
+    app_id: Optional[int] = Query(None),
+    price: Optional[float] = Query(None),
+    dlc_count: Optional[int] = Query(None),
+    score_rank: Optional[int] = Query(None),
+    positive_reviews: Optional[int] = Query(None),
+    negative_reviews: Optional[int] = Query(None),
+    required_age: Optional[int] = Query(None),
+    # Range Filters
+    release_date_min: Optional[date] = Query(None),
+    release_date_max: Optional[date] = Query(None),
+    price_min: Optional[float] = Query(None),
+    price_max: Optional[float] = Query(None),
+    positive_reviews_min: Optional[int] = Query(None),
+    positive_reviews_max: Optional[int] = Query(None),
+    negative_reviews_min: Optional[int] = Query(None),
+    negative_reviews_max: Optional[int] = Query(None),
+) -> FilterParams:
+    try:
+        return FilterParams(
+            search=search,
+            name=name,
+            about_the_game=about_the_game,
+            developers=developers,
+            publishers=publishers,
+            categories=categories,
+            supported_languages=supported_languages,
+            genres=genres,
+            tags=tags,
+            platforms=platforms,
+            match=match,
+            release_date=release_date,
+            app_id=app_id,
+            price=price,
+            dlc_count=dlc_count,
+            score_rank=score_rank,
+            positive_reviews=positive_reviews,
+            negative_reviews=negative_reviews,
+            required_age=required_age,
+            release_date_min=release_date_min,
+            release_date_max=release_date_max,
+            price_min=price_min,
+            price_max=price_max,
+            positive_reviews_min=positive_reviews_min,
+            positive_reviews_max=positive_reviews_max,
+            negative_reviews_min=negative_reviews_min,
+            negative_reviews_max=negative_reviews_max
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def requested_fields(
+    fields: Optional[List[str]] = Query(None, description="game fields to return, comma separated, defaults to all"),
+    include: Optional[List[str]] = Query(
+        None, description="collections to return, comma separated, defaults to all unless fields is given"
+    ),
+) -> Optional[List[str]]:
+    """Requested game fields in GameResponse order, None for the whole game."""
+    try:
+        return response_fields(FieldParams(fields=fields, include=include))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from server.api.dependencies import filter_params, requested_fields
+from server.config import settings
+from server.models.pydantic_models import FilterParams
+from server.services.export_service import EXPORT_FORMATS, export_games
+from typing import Optional, List, Literal
+
+router = APIRouter()
+
+
+@router.get('/export')
+def export_data(
+    format: Literal['ndjson', 'csv', 'parquet'] = Query('ndjson', description="ndjson, csv or parquet (requires pyarrow)"),
+    filters: FilterParams = Depends(filter_params),
+    fields: Optional[List[str]] = Depends(requested_fields)
+):
+    # All games matching the filters in one response, in id order, without pagination
+    export_format = EXPORT_FORMATS[format]
+    if not export_format.available():
+        raise HTTPException(status_code=501, detail=f"{format} export is not available, install pyarrow")
+    return StreamingResponse(
+        export_games(filters, fields, export_format, settings.EXPORT_BATCH_SIZE),
+        media_type=export_format.media_type,
+        headers={'Content-Disposition': f'attachment; filename="games.{export_format.extension}"'}
+    )
@@ -1,13 +1,27 @@
 # server/api/health.py
 
 from fastapi import APIRouter, status
-from typing import Dict
+from typing import Dict, Optional
 from sqlalchemy.sql import text
-from server.db.session import engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from server.config import settings
+from server.db.pool_stats import pool_status
+from server.db.session import async_engine, async_read_engine, connection_pools
+from server.models.pydantic_models import DetailedHealthResponse
 
 router = APIRouter()
 
 
+async def database_error(engine: AsyncEngine) -> Optional[str]:
+    # A connection of the engine's pool, pre-pinged when it was idle
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return str(e)
+    return None
+
+
 @router.get(
     "/health",
     response_model=Dict[str, str],
@@ -23,12 +37,36 @@ async def health_check() -> Dict[str, str]:
     }
 
     # Check database connectivity
-    try:
-        with engine.connect() as connection:
-            connection.execute(text("SELECT 1"))
-    except Exception as e:
+    error = await database_error(async_engine)
+    if error:
         health_status["database"] = "error"
         health_status["status"] = "unhealthy"
-        health_status["database_error"] = str(e)
+        health_status["database_error"] = error
 
     return health_status
+
+
+@router.get(
+    "/health/detailed",
+    response_model=DetailedHealthResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Detailed Health Check",
+    description="Database health of the primary and the replica, and statistics of every connection pool"
+)
+async def detailed_health_check():
+    engines = {'primary': async_engine}
+    if settings.DATABASE_READ_URL:
+        engines['read'] = async_read_engine
+    errors = {}
+    for name, engine in engines.items():
+        error = await database_error(engine)
+        if error:
+            errors[name] = error
+
+    return {
+        "status": "unhealthy" if errors else "healthy",
+        "api": "ok",
+        "databases": {name: "error" if name in errors else "ok" for name in engines},
+        "database_errors": errors or None,
+        "pools": {name: pool_status(pool) for name, pool in connection_pools().items()},
+    }
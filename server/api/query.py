@@ -1,125 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from server.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from server.config import settings
+from server.db.session import get_async_read_db
+from server.api.dependencies import filter_params, requested_fields
 from server.models.pydantic_models import (
+    FacetsResponse,
     FilterParams,
     PaginationParams,
-    PaginatedResponse,
-    GameResponse
+    PaginatedResponse
 )
-from server.services.game_service import get_filtered_games
-from typing import Optional, List
-from datetime import date
+from server.services.cache_service import create_cache, get_dataset_version
+from server.services.facet_service import get_facets
+from server.services.game_service import game_to_dict, get_filtered_games_async, query_key
+from server.utils import json_utils
+from server.utils.http_utils import etag_matches, make_etag
+from typing import Optional, List, Literal
 
 router = APIRouter()
 
+# Serialized responses keyed by (dataset version, query key)
+response_cache = create_cache(settings.QUERY_CACHE_BACKEND, settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_SECONDS)
+
+
 @router.get('/query', response_model=PaginatedResponse)
-def query_games(
+async def query_games(
+    request: Request,
     # Pagination Parameters
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    # Filter Parameters
-    name: Optional[str] = Query(None),
-    about_the_game: Optional[str] = Query(None),
-    developers: Optional[List[str]] = Query(None),
-    publishers: Optional[List[str]] = Query(None),
-    categories: Optional[List[str]] = Query(None),
-    supported_languages: Optional[List[str]] = Query(None),
-    genres: Optional[List[str]] = Query(None),
-    tags: Optional[List[str]] = Query(None),
-    platforms: Optional[List[str]] = Query(None),
-    release_date: Optional[date] = Query(None),
-    app_id: Optional[int] = Query(None),
-    price: Optional[float] = Query(None),
-    dlc_count: Optional[int] = Query(None),
-    score_rank: Optional[int] = Query(None),
-    positive_reviews: Optional[int] = Query(None),
-    negative_reviews: Optional[int] = Query(None),
-    required_age: Optional[int] = Query(None),
-    # Range Filters
-    release_date_min: Optional[date] = Query(None),
-    release_date_max: Optional[date] = Query(None),
-    price_min: Optional[float] = Query(None),
-    price_max: Optional[float] = Query(None),
-    positive_reviews_min: Optional[int] = Query(None),
-    positive_reviews_max: Optional[int] = Query(None),
-    negative_reviews_min: Optional[int] = Query(None),
-    negative_reviews_max: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces page"),
+    sort_by: Optional[Literal['id', 'app_id', 'name', 'release_date', 'price', 'relevance']] = Query(
+        None, description="defaults to relevance when searching, id otherwise"
+    ),
+    sort_order: Literal['asc', 'desc'] = Query('asc'),
+    count: Literal['exact', 'estimate', 'none'] = Query('exact', description="how total_records is computed, none only returns has_more"),
+    filters: FilterParams = Depends(filter_params),
+    fields: Optional[List[str]] = Depends(requested_fields),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    # Manually construct the FilterParams and PaginationParams models
-    filters = FilterParams(
-        name=name,
-        about_the_game=about_the_game,
-        developers=developers,
-        publishers=publishers,
-        categories=categories,
-        supported_languages=supported_languages,
-        genres=genres,
-        tags=tags,
-        platforms=platforms,
-        release_date=release_date,
-        app_id=app_id,
-        price=price,
-        dlc_count=dlc_count,
-        score_rank=score_rank,
-        positive_reviews=positive_reviews,
-        negative_reviews=negative_reviews,
-        required_age=required_age,
-        release_date_min=release_date_min,
-        release_date_max=release_date_max,
-        price_min=price_min,
-        price_max=price_max,
-        positive_reviews_min=positive_reviews_min,
-        positive_reviews_max=positive_reviews_max,
-        negative_reviews_min=negative_reviews_min,
-        negative_reviews_max=negative_reviews_max
+    # Manually construct the PaginationParams model
+    pagination = PaginationParams(
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        sort_by=sort_by or ('relevance' if filters.search is not None else 'id'),
+        sort_order=sort_order,
+        count=count
     )
-    pagination = PaginationParams(page=page, page_size=page_size)
+    version = await db.run_sync(get_dataset_version)
+    key = query_key(filters, pagination, fields)
+    headers = {'ETag': make_etag(version, key), 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get((version, key))
+    if body is not None:
+        return Response(content=body, media_type='application/json', headers=headers)
+
     try:
-        games, total_records, total_pages = get_filtered_games(
+        game_page = await get_filtered_games_async(
             db=db,
             filters=filters,
-            pagination=pagination
+            pagination=pagination,
+            fields=fields
         )
 
-        # Serialize results
-        results = []
-        for game in games:
-            game_data = GameResponse(
-                app_id=game.app_id,
-                name=game.name,
-                release_date=game.release_date,
-                required_age=game.required_age,
-                price=game.price,
-                dlc_count=game.dlc_count,
-                about_the_game=game.about_the_game,
-                supported_languages=[language.name for language in game.languages],
-                platforms={
-                    'windows': game.windows,
-                    'mac': game.mac,
-                    'linux': game.linux
-                },
-                positive_reviews=game.positive,
-                negative_reviews=game.negative,
-                score_rank=game.score_rank,
-                developers=[developer.name for developer in game.developers],
-                publishers=[publisher.name for publisher in game.publishers],
-                categories=[category.name for category in game.categories],
-                genres=[genre.name for genre in game.genres],
-                tags=[tag.name for tag in game.tags]
-            )
-            results.append(game_data)
+        # Plain dicts in the field order of PaginatedResponse and GameResponse, encoded once,
+        # games only have the requested fields
+        response = {
+            'page': None if pagination.cursor else pagination.page,
+            'page_size': pagination.page_size,
+            'total_pages': game_page.total_pages,
+            'total_records': game_page.total_records,
+            'total_records_estimated': game_page.total_records_estimated,
+            'has_more': game_page.has_more,
+            'next_cursor': game_page.next_cursor,
+            'results': [game_to_dict(game, fields) for game in game_page.games]
+        }
 
-        response = PaginatedResponse(
-            page=pagination.page,
-            page_size=pagination.page_size,
-            total_pages=total_pages,
-            total_records=total_records,
-            results=results
-        )
+        body = json_utils.dumps(response)
+        response_cache.set((version, key), body)
+        return Response(content=body, media_type='application/json', headers=headers)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return response
 
+@router.get('/query/facets', response_model=FacetsResponse)
+async def query_facets(
+    facets: List[Literal['developers', 'publishers', 'categories', 'genres', 'tags', 'supported_languages', 'platforms']] = Query(
+        ['genres', 'tags', 'developers', 'platforms'], description="dimensions to count"
+    ),
+    limit: int = Query(10, ge=1, le=100, description="values returned per facet, most frequent first"),
+    filters: FilterParams = Depends(filter_params),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    try:
+        return FacetsResponse(facets=await db.run_sync(get_facets, filters, list(dict.fromkeys(facets)), limit))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
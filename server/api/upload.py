@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from server.db.session import get_db
+from server.db.session import get_db, record_write
 from server.services.upload_service import process_csv_from_url
 from server.models.pydantic_models import (
     UploadRequest,
@@ -26,13 +26,23 @@ async def upload_data(
     db: Session = Depends(get_db)
 ):
     try:
-        rows_processed_successfully, rows_could_not_be_processed, errors = await process_csv_from_url(str(request.file_url), db)
+        result = await process_csv_from_url(str(request.file_url), db, incremental=request.incremental)
+        record_write()
+        rows_processed_successfully = result["rows_processed_successfully"]
+        rows_could_not_be_processed = result["rows_could_not_be_processed"]
+        errors = result["errors"]
+        counts = {
+            "rows_inserted": result["rows_inserted"],
+            "rows_updated": result["rows_updated"],
+            "rows_unchanged": result["rows_unchanged"]
+        }
         print(f"Processed {rows_processed_successfully} rows successfully and {rows_could_not_be_processed} rows could not be processed")
         if rows_processed_successfully == 0:
             error_response = UploadProcessingErrorResponse(
                 message="CSV file could not be processed",
                 rows_processed_successfully=rows_processed_successfully,
                 rows_could_not_be_processed=rows_could_not_be_processed,
+                **counts,
                 errors=errors,
                 status=ResponseStatus.FAILED.value
             )
@@ -46,6 +56,7 @@ async def upload_data(
                 message="Not all rows could be processed successfully, find detailed errors below",
                 rows_processed_successfully=rows_processed_successfully,
                 rows_could_not_be_processed=rows_could_not_be_processed,
+                **counts,
                 errors=errors,
                 status="partially_completed"
             )
@@ -58,6 +69,7 @@ async def upload_data(
             message="CSV file processed successfully",
             rows_processed_successfully=rows_processed_successfully,
             rows_could_not_be_processed=rows_could_not_be_processed,
+            **counts,
             errors=errors,
             status=ResponseStatus.COMPLETED.value
         )
@@ -1,4 +1,5 @@
 import os
+import tempfile
 import dotenv
 
 if os.environ.get("ENV") and os.environ.get("ENV") == "local":
@@ -11,5 +12,70 @@ class Settings:
         raise ValueError("No DATABASE_URL environment variable set")
     else:
         print(f"DATABASE_URL loaded from environment variable: {DATABASE_URL}")
+    # Optional replica serving the read-only endpoints, writes always go to DATABASE_URL
+    DATABASE_READ_URL = os.getenv('DATABASE_READ_URL')
+    # Reads go to the primary for this many seconds after the process wrote (ingest batches,
+    # task updates), so clients see their own writes while the replica catches up. 0 disables it
+    READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
 
-settings = Settings()
\ No newline at end of file
+    # Connection pools, one per engine: sync and async, of the primary and of the replica
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    # Connections opened beyond DB_POOL_SIZE under load, closed again when they are returned
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    # Seconds a checkout waits for a free connection before failing
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    # Connections are replaced after this many seconds, before the database or a proxy drops them. -1 keeps them
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    # Checked out connections are tested with a round trip first, dropped ones are replaced transparently
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+    # Ingestion
+    # auto: COPY based engine on PostgreSQL, SQLAlchemy bulk inserts everywhere else
+    INGEST_ENGINE = os.getenv('INGEST_ENGINE', 'auto')
+    # Rows parsed, validated and written per step of the streaming pipeline
+    INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 5000))
+    # Processes validating chunks in parallel, 0 or 1 validates in the server process
+    INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', 0))
+    # Threads parsing, validating and writing uploads, shared by all uploads of a server process
+    INGEST_THREADS = int(os.getenv('INGEST_THREADS', 4))
+    # Progress of async uploads is stored at most this often
+    INGEST_PROGRESS_SECONDS = float(os.getenv('INGEST_PROGRESS_SECONDS', 2))
+    # Error messages kept per upload, the task checkpoint stores them with every batch. Failed rows beyond
+    # this are only counted
+    INGEST_MAX_ERRORS = int(os.getenv('INGEST_MAX_ERRORS', 1000))
+    # Download buffer, at most DOWNLOAD_QUEUE_SIZE chunks are held in memory
+    DOWNLOAD_CHUNK_BYTES = int(os.getenv('DOWNLOAD_CHUNK_BYTES', 64 * 1024))
+    DOWNLOAD_QUEUE_SIZE = int(os.getenv('DOWNLOAD_QUEUE_SIZE', 16))
+    # Async uploads keep a local copy of the file here until they complete, so they can be resumed
+    INGEST_SPOOL_DIR = os.getenv('INGEST_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'watcher-ingest'))
+    # Local copies of failed uploads are kept this long for a resume, those of other finished uploads are deleted
+    INGEST_SPOOL_RETENTION_SECONDS = int(os.getenv('INGEST_SPOOL_RETENTION_SECONDS', 24 * 3600))
+
+    # Job queue
+    # Async uploads processed at the same time by this server process, 0 leaves them to dedicated workers
+    INGEST_JOB_WORKERS = int(os.getenv('INGEST_JOB_WORKERS', 2))
+    # Idle workers look for queued jobs this often
+    INGEST_JOB_POLL_SECONDS = float(os.getenv('INGEST_JOB_POLL_SECONDS', 2))
+    # A job whose worker did not renew its lease for this long is picked up by another worker
+    INGEST_JOB_LEASE_SECONDS = int(os.getenv('INGEST_JOB_LEASE_SECONDS', 300))
+    INGEST_JOB_MAX_ATTEMPTS = int(os.getenv('INGEST_JOB_MAX_ATTEMPTS', 3))
+
+    # Queries
+    # Exact total_records of recently queried filters, invalidated by every ingest commit
+    QUERY_COUNT_CACHE_SIZE = int(os.getenv('QUERY_COUNT_CACHE_SIZE', 1024))
+    QUERY_COUNT_CACHE_SECONDS = float(os.getenv('QUERY_COUNT_CACHE_SECONDS', 300))
+    # Serialized /api/query responses, invalidated by every ingest commit. memory or none
+    QUERY_CACHE_BACKEND = os.getenv('QUERY_CACHE_BACKEND', 'memory')
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 256))
+    QUERY_CACHE_SECONDS = float(os.getenv('QUERY_CACHE_SECONDS', 60))
+    # Multi-value filters matching at most this many dimension ids use the game_search projection (PostgreSQL)
+    QUERY_PROJECTION_MAX_IDS = int(os.getenv('QUERY_PROJECTION_MAX_IDS', 32))
+    # Facet counts of recently queried filters, invalidated by every ingest commit
+    QUERY_FACET_CACHE_SIZE = int(os.getenv('QUERY_FACET_CACHE_SIZE', 1024))
+    QUERY_FACET_CACHE_SECONDS = float(os.getenv('QUERY_FACET_CACHE_SECONDS', 300))
+
+    # Exports
+    # Games read from the database cursor and written to the response at a time
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+settings = Settings()
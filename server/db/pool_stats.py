@@ -0,0 +1,162 @@
+# server/db/pool_stats.py
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Union
+from sqlalchemy import event, exc
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import Pool, QueuePool
+from server.config import settings
+
+# Most recent checkout latencies per pool, the percentiles are computed over them
+LATENCY_SAMPLES = 1000
+
+
+class PoolStats:
+    """Counters of one connection pool, updated by its pool events and timed checkouts."""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def wait_started(self):
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def checkout_ended(self, seconds: float, timed_out: bool, waited: bool):
+        with self._lock:
+            if waited:
+                self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.latencies.append(seconds)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def latency_ms(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return {"avg": None, "p50": None, "p95": None, "max": None}
+        return {
+            "avg": round(sum(latencies) * 1000 / len(latencies), 2),
+            "p50": round(latencies[len(latencies) // 2] * 1000, 2),
+            "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        }
+
+
+class TimedCheckout:
+    """Pool mixin timing how long connect() takes: waiting for a free connection, opening one and the pre-ping."""
+
+    stats: PoolStats
+
+    def must_wait(self) -> bool:
+        # Same condition QueuePool blocks on: no idle connection and the overflow used up
+        if not isinstance(self, QueuePool) or self._max_overflow == -1:
+            return False
+        return self.checkedin() == 0 and self.overflow() >= self._max_overflow
+
+    def connect(self):
+        waited = self.must_wait()
+        if waited:
+            self.stats.wait_started()
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.checkout_ended(time.perf_counter() - started, timed_out, waited)
+
+
+def pool_options(url: Union[str, URL]) -> Dict[str, Any]:
+    """
+    create_engine arguments of an engine's connection pool, configured by the DB_POOL_* settings.
+
+    The pool class is the dialect's default one (e.g. NullPool for aiosqlite files) extended to
+    time checkouts. Size, overflow and timeout only apply to queue pools.
+    """
+    url = make_url(url)
+    pool_class = url.get_dialect().get_pool_class(url)
+    options = {
+        'poolclass': type(pool_class.__name__, (TimedCheckout, pool_class), {'stats': PoolStats()}),
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+    }
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def listen_pool_events(pool: Pool):
+    # Kept by the pool engine.dispose() creates in its place
+    stats = pool.stats
+    event.listen(pool, 'connect', stats.on_connect)
+    event.listen(pool, 'checkout', stats.on_checkout)
+    event.listen(pool, 'checkin', stats.on_checkin)
+    event.listen(pool, 'invalidate', stats.on_invalidate)
+
+
+def pool_status(pool: Pool) -> Dict[str, Any]:
+    stats = pool.stats
+    status = {
+        "pool_class": type(pool).__name__,
+        "size": None,
+        "max_overflow": None,
+        "checked_in": None,
+        "checked_out": stats.checked_out,
+        "overflow": None,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            checked_in=pool.checkedin(),
+            # Negative while fewer than size connections were opened
+            overflow=pool.overflow(),
+            checked_out=pool.checkedout(),
+        )
+    status.update(
+        peak_checked_out=stats.peak_checked_out,
+        waiting=stats.waiting,
+        peak_waiting=stats.peak_waiting,
+        checkouts=stats.checkouts,
+        connects=stats.connects,
+        invalidations=stats.invalidations,
+        timeouts=stats.timeouts,
+        checkout_latency_ms=stats.latency_ms(),
+    )
+    return status
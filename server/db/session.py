@@ -1,10 +1,80 @@
 # server/db/session.py
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from server.config import settings
+from server.db.pool_stats import listen_pool_events, pool_options
 
-engine = create_engine(settings.DATABASE_URL)
+# Async drivers by database backend, DATABASE_URL names the sync driver
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(url: str):
+    url = make_url(url)
+    # asyncpg takes libpq's sslmode values as ssl
+    if 'sslmode' in url.query:
+        url = url.difference_update_query(['sslmode']).update_query_dict({'ssl': url.query['sslmode']})
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def create_engines(url: str):
+    """The sync and the async engine of a database, each with an instrumented connection pool."""
+    async_url = async_database_url(url)
+    sync_engine = create_engine(url, **pool_options(url))
+    async_engine = create_async_engine(async_url, **pool_options(async_url))
+    listen_pool_events(sync_engine.pool)
+    listen_pool_events(async_engine.sync_engine.pool)
+    return sync_engine, async_engine
+
+
+# The async engine is used by the async endpoints, the number of concurrent queries is bounded by its connection pool
+engine, async_engine = create_engines(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read-only endpoints use the replica of DATABASE_READ_URL with pools of its own, the primary without one
+if settings.DATABASE_READ_URL:
+    read_engine, async_read_engine = create_engines(settings.DATABASE_READ_URL)
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+def connection_pools():
+    """The connection pools of this process by engine."""
+    engines = {'primary': engine, 'primary_async': async_engine.sync_engine}
+    if settings.DATABASE_READ_URL:
+        engines.update(read=read_engine, read_async=async_read_engine.sync_engine)
+    return {name: pool_engine.pool for name, pool_engine in engines.items()}
+
+
+# time.monotonic() of the last write of this process
+last_write_at = None
+
+
+def record_write():
+    """Starts the read-your-writes window, called when an ingest finished or a task was queued, not per batch."""
+    global last_write_at
+    last_write_at = time.monotonic()
+
+
+def reads_use_primary() -> bool:
+    return last_write_at is not None and time.monotonic() - last_write_at < settings.READ_YOUR_WRITES_SECONDS
+
+
+def read_session_factory():
+    return SessionLocal if reads_use_primary() else ReadSessionLocal
+
+
+def async_read_session_factory():
+    return AsyncSessionLocal if reads_use_primary() else AsyncReadSessionLocal
 
 def get_db():
     db = SessionLocal()
@@ -12,3 +82,18 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    db = read_session_factory()()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with async_read_session_factory()() as db:
+        yield db
@@ -2,9 +2,12 @@
 
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.responses import JSONResponse
-from server.api import upload, query, health, async_upload
-from server.db.session import engine
+from server.api import upload, query, health, async_upload, export
+from server.db.session import engine, async_engine, async_read_engine, SessionLocal
 from server.db.base import Base
+from server.services import job_queue
+from server.services.projection_service import backfill_game_search
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
@@ -15,12 +18,28 @@ from starlette.responses import RedirectResponse
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIR = os.path.join(BASE_DIR, "frontend")
 ENV = os.getenv("ENV")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Projection rows of games written before game_search existed
+    with SessionLocal() as db:
+        backfill_game_search(db)
+        db.commit()
+    # Ingest workers processing queued async uploads
+    job_queue.start_workers()
+    yield
+    await job_queue.stop_workers()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
 # Initialize FastAPI server
 app = FastAPI(
     title="Game Data API",
     description="API for game data management and analytics",
     debug=True,
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add the following lines
@@ -52,6 +71,7 @@ app.include_router(upload.router, prefix="/api", tags=["Upload"])
 app.include_router(health.router, prefix="/api", tags=["Health"])
 app.include_router(query.router, prefix="/api", tags=["Query"])
 app.include_router(async_upload.router, prefix="/api", tags=["Async Upload"])
+app.include_router(export.router, prefix="/api", tags=["Export"])
 
 # Create all tables in the database
 Base.metadata.create_all(bind=engine)
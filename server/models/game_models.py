@@ -1,5 +1,6 @@
 # server/models/game_models.py
-from sqlalchemy import Column, Integer, String, Date, SmallInteger, Boolean, DECIMAL, Text
+from sqlalchemy import Column, Integer, String, Date, SmallInteger, Boolean, DECIMAL, Text, Index, ForeignKey, JSON, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from server.db.base import Base
 from .relationship_models import (
@@ -13,6 +14,32 @@ from .relationship_models import (
 
 class Game(Base):
     __tablename__ = 'games'
+    __table_args__ = (
+        # Keyset pagination orders by (sort column, id), also serve the release_date and price filters
+        Index('ix_games_name_id', 'name', 'id'),
+        Index('ix_games_release_date_id', 'release_date', 'id'),
+        Index('ix_games_price_id', 'price', 'id'),
+        # Range filters
+        Index('ix_games_positive', 'positive'),
+        Index('ix_games_negative', 'negative'),
+        # Exact matches on columns where most games share one value (no rank, no age limit, no DLC),
+        # the partial indexes skip that value, which is left to sequential scans anyway
+        Index(
+            'ix_games_score_rank', 'score_rank',
+            postgresql_where=text('score_rank IS NOT NULL'), sqlite_where=text('score_rank IS NOT NULL')
+        ),
+        Index(
+            'ix_games_required_age', 'required_age',
+            postgresql_where=text('required_age <> 0'), sqlite_where=text('required_age <> 0')
+        ),
+        Index(
+            'ix_games_dlc_count', 'dlc_count',
+            postgresql_where=text('dlc_count <> 0'), sqlite_where=text('dlc_count <> 0')
+        ),
+        # Platform filters, the ids of the mac and linux games in page order (nearly every game runs on windows)
+        Index('ix_games_mac_id', 'id', postgresql_where=text('mac'), sqlite_where=text('mac')),
+        Index('ix_games_linux_id', 'id', postgresql_where=text('linux'), sqlite_where=text('linux')),
+    )
 
     id = Column(Integer, primary_key=True)
     app_id = Column(Integer, unique=True, nullable=False)
@@ -28,6 +55,8 @@ class Game(Base):
     windows = Column(Boolean, default=False)
     mac = Column(Boolean, default=False)
     linux = Column(Boolean, default=False)
+    # Content hash of the source CSV row, lets incremental uploads skip unchanged games
+    row_hash = Column(String(32))
 
     developers = relationship('Developer', secondary=game_developers, back_populates='games')
     publishers = relationship('Publisher', secondary=game_publishers, back_populates='games')
@@ -83,4 +112,27 @@ class Language(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True, nullable=False)
 
-    games = relationship('Game', secondary=game_languages, back_populates='languages')
\ No newline at end of file
+    games = relationship('Game', secondary=game_languages, back_populates='languages')
+
+
+# Integer arrays on PostgreSQL, the projection is neither filled nor queried on other databases
+ID_ARRAY = ARRAY(Integer).with_variant(JSON(), 'sqlite')
+
+class GameSearch(Base):
+    """
+    Read model of the multi-value filters, one row per game holding the ids of its
+    dimensions. Refreshed by the ingest engines for the games a batch touched.
+    """
+    __tablename__ = 'game_search'
+    __table_args__ = tuple(
+        Index(f'ix_game_search_{column}', column, postgresql_using='gin')
+        for column in ['developer_ids', 'publisher_ids', 'category_ids', 'genre_ids', 'tag_ids', 'language_ids']
+    )
+
+    game_id = Column(Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True)
+    developer_ids = Column(ID_ARRAY, nullable=False)
+    publisher_ids = Column(ID_ARRAY, nullable=False)
+    category_ids = Column(ID_ARRAY, nullable=False)
+    genre_ids = Column(ID_ARRAY, nullable=False)
+    tag_ids = Column(ID_ARRAY, nullable=False)
+    language_ids = Column(ID_ARRAY, nullable=False)
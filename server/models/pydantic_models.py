@@ -1,15 +1,18 @@
 from pydantic import BaseModel, HttpUrl, Field, field_validator
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from datetime import date, datetime
 
 # Upload API Request Model
 class UploadRequest(BaseModel):
     file_url: HttpUrl
+    # Only apply rows that changed since the previous upload of the same games
+    incremental: bool = False
 
     class Config:
         json_schema_extra = {
             "example": {
-                "file_url": "https://example.com/data.csv"
+                "file_url": "https://example.com/data.csv",
+                "incremental": False
             }
         }
 
@@ -17,11 +20,24 @@ class TaskResponse(BaseModel):
     task_id: str
     message: str
 
+class TaskProgress(BaseModel):
+    rows_downloaded: int
+    rows_validated: int
+    rows_written: int
+    rows_total_estimate: Optional[int] = None
+    bytes_received: int
+    bytes_total: Optional[int] = None
+    rows_per_second: float
+    percent_done: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    updated_at: datetime
+
 class TaskStatusResponse(BaseModel):
     task_id: str
     status: str
     message: Optional[str] = None
     result: Optional[Dict[str, Any]] = None
+    progress: Optional[TaskProgress] = None
     created_at: datetime
     completed_at: Optional[datetime] = None
 
@@ -30,6 +46,9 @@ class UploadResponse(BaseModel):
     message: str
     rows_processed_successfully: Optional[int] = None
     rows_could_not_be_processed: Optional[int] = None
+    rows_inserted: Optional[int] = None
+    rows_updated: Optional[int] = None
+    rows_unchanged: Optional[int] = None
     errors: Optional[Dict[str, str]] = None
     status: str = "success"
 
@@ -40,6 +59,9 @@ class UploadProcessingErrorResponse(BaseModel):
     message: str
     rows_processed_successfully: Optional[int] = None
     rows_could_not_be_processed: Optional[int] = None
+    rows_inserted: Optional[int] = None
+    rows_updated: Optional[int] = None
+    rows_unchanged: Optional[int] = None
     errors: Optional[Dict[Any, Any]]
     status: str
 
@@ -48,8 +70,18 @@ class UploadProcessingErrorResponse(BaseModel):
 class PaginationParams(BaseModel):
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=10, ge=1, le=100)
+    # Keyset pagination: the next_cursor of the previous page, page is ignored when given
+    cursor: Optional[str] = None
+    # relevance orders the best matches of search first
+    sort_by: Literal['id', 'app_id', 'name', 'release_date', 'price', 'relevance'] = 'id'
+    sort_order: Literal['asc', 'desc'] = 'asc'
+    # exact: cached COUNT, estimate: the planner's row estimate, none: only has_more
+    count: Literal['exact', 'estimate', 'none'] = 'exact'
 
 class FilterParams(BaseModel):
+    # Full text search of name and about_the_game
+    search: Optional[str] = None
+
     # Text fields
     name: Optional[str] = None
     about_the_game: Optional[str] = None
@@ -60,6 +92,8 @@ class FilterParams(BaseModel):
     tags: Optional[List[str]] = None
     platforms: Optional[List[str]] = None
     supported_languages: Optional[List[str]] = None
+    # How values of the multi-value fields match dimension names
+    match: Literal['exact', 'prefix', 'contains'] = 'contains'
 
     # Date fields
     release_date: Optional[date] = None
@@ -94,6 +128,26 @@ class FilterParams(BaseModel):
                 raise ValueError("Invalid platform. Must be one of: windows, mac, linux")
         return v
 
+class FieldParams(BaseModel):
+    # Scalar keys of GameResponse to return, all of them when not given
+    fields: Optional[List[Literal[
+        'app_id', 'name', 'release_date', 'required_age', 'price', 'dlc_count', 'about_the_game',
+        'platforms', 'positive_reviews', 'negative_reviews', 'score_rank'
+    ]]] = None
+    # Collections to return, all of them when neither fields nor include is given
+    include: Optional[List[Literal[
+        'supported_languages', 'developers', 'publishers', 'categories', 'genres', 'tags'
+    ]]] = None
+
+    @field_validator('fields', 'include', mode='before')
+    def split_comma_separated(cls, v):
+        # fields=name,price and fields=name&fields=price are the same
+        if isinstance(v, str):
+            v = [v]
+        if v:
+            v = [item.strip() for value in v for item in value.split(',') if item.strip()]
+        return v
+
 # Query API Response Models
 
 class GameResponse(BaseModel):
@@ -116,8 +170,54 @@ class GameResponse(BaseModel):
     tags: List[str]
 
 class PaginatedResponse(BaseModel):
-    page: int
+    page: Optional[int] = None
     page_size: int
-    total_pages: int
-    total_records: int
+    total_pages: Optional[int] = None
+    total_records: Optional[int] = None
+    # True when total_records is the planner's estimate instead of an exact count
+    total_records_estimated: bool = False
+    has_more: bool
+    next_cursor: Optional[str] = None
     results: List[GameResponse]
+
+class FacetCount(BaseModel):
+    name: str
+    count: int
+
+class FacetsResponse(BaseModel):
+    # Facet -> its most frequent values among the filtered games
+    facets: Dict[str, List[FacetCount]]
+
+# Health API Response Models
+class CheckoutLatency(BaseModel):
+    avg: Optional[float] = None
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    max: Optional[float] = None
+
+class PoolStatus(BaseModel):
+    pool_class: str
+    # Limits and current counts of queue pools, None for other pool classes
+    size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: int
+    overflow: Optional[int] = None
+    peak_checked_out: int
+    # Checkouts currently blocked on an exhausted pool
+    waiting: int
+    peak_waiting: int
+    checkouts: int
+    connects: int
+    invalidations: int
+    timeouts: int
+    # Over the most recent checkouts
+    checkout_latency_ms: CheckoutLatency
+
+class DetailedHealthResponse(BaseModel):
+    status: str
+    api: str
+    # Engine -> "ok" or "error"
+    databases: Dict[str, str]
+    database_errors: Optional[Dict[str, str]] = None
+    pools: Dict[str, PoolStatus]
@@ -1,48 +1,60 @@
 # server/models/relationship_models.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from server.db.base import Base
 
-# Association Tables
+# Association Tables, the (game_id, x_id) primary keys load the dimensions of games
 game_developers = Table(
     'game_developers',
     Base.metadata,
     Column('game_id', Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True),
-    Column('developer_id', Integer, ForeignKey('developers.id', ondelete='CASCADE'), primary_key=True)
+    Column('developer_id', Integer, ForeignKey('developers.id', ondelete='CASCADE'), primary_key=True),
+    # Reverse of the primary key, games by developer
+    Index('ix_game_developers_developer_id_game_id', 'developer_id', 'game_id')
 )
 
 game_publishers = Table(
     'game_publishers',
     Base.metadata,
     Column('game_id', Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True),
-    Column('publisher_id', Integer, ForeignKey('publishers.id', ondelete='CASCADE'), primary_key=True)
+    Column('publisher_id', Integer, ForeignKey('publishers.id', ondelete='CASCADE'), primary_key=True),
+    # Reverse of the primary key, games by publisher
+    Index('ix_game_publishers_publisher_id_game_id', 'publisher_id', 'game_id')
 )
 
 game_categories = Table(
     'game_categories',
     Base.metadata,
     Column('game_id', Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True),
-    Column('category_id', Integer, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    Column('category_id', Integer, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True),
+    # Reverse of the primary key, games by category
+    Index('ix_game_categories_category_id_game_id', 'category_id', 'game_id')
 )
 
 game_genres = Table(
     'game_genres',
     Base.metadata,
     Column('game_id', Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True),
-    Column('genre_id', Integer, ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True)
+    Column('genre_id', Integer, ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True),
+    # Reverse of the primary key, games by genre
+    Index('ix_game_genres_genre_id_game_id', 'genre_id', 'game_id')
 )
 
 game_tags = Table(
     'game_tags',
     Base.metadata,
     Column('game_id', Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    # Reverse of the primary key, games by tag
+    Index('ix_game_tags_tag_id_game_id', 'tag_id', 'game_id')
 )
 
 game_languages = Table(
     'game_languages',
     Base.metadata,
     Column('game_id', Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True),
-    Column('language_id', Integer, ForeignKey('languages.id', ondelete='CASCADE'), primary_key=True)
+    Column('language_id', Integer, ForeignKey('languages.id', ondelete='CASCADE'), primary_key=True),
+    # Reverse of the primary key, games by language
+    Index('ix_game_languages_language_id_game_id', 'language_id', 'game_id')
 )
 
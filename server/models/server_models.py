@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy import Column, String, DateTime, JSON, Integer, Boolean
 from server.db.base import Base
 from datetime import datetime
 from server.constants.status import TaskStatus
@@ -14,7 +14,25 @@ class APIRequest(Base):
     result = Column(JSON, nullable=True)
     error = Column(String, nullable=True)
     error_code = Column(String, nullable=True)
+    file_url = Column(String, nullable=True)
+    incremental = Column(Boolean, nullable=False, default=False, server_default='false')
+    # Number of CSV rows already committed, an interrupted upload resumes from here
+    rows_committed = Column(Integer, nullable=False, default=0, server_default='0')
+    # Job queue lease: the worker holding the task renews heartbeat_at while it runs
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    # Rows downloaded, validated and written, throughput and ETA of the running ingest
+    progress = Column(JSON, nullable=True)
 
 
     def __repr__(self):
-        return f"<APIRequest id={self.id} status={self.status} created_at={self.created_at} completed_at={self.completed_at} result={self.result} error_code={self.error_code}>"
\ No newline at end of file
+        return f"<APIRequest id={self.id} status={self.status} created_at={self.created_at} completed_at={self.completed_at} result={self.result} error_code={self.error_code}>"
+
+
+class DatasetVersion(Base):
+    """Single row counter, incremented by every ingest commit that writes games."""
+    __tablename__ = "dataset_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default='0')
@@ -0,0 +1,43 @@
+# Compares the ingest engines on a synthetic file against DATABASE_URL.
+# Every run happens inside a transaction that is rolled back, the database is left untouched.
+import argparse
+import time
+from server.db.base import Base
+from server.db.session import engine, SessionLocal
+from server.scripts.synthetic_data import generate_games_csv_frame
+from server.services.ingest_engines import INGEST_ENGINES, get_ingest_engine
+from server.utils.data_utils import validate_games_frame
+from server.utils.db_utils import is_postgresql
+
+
+def benchmark(rows: int, engine_names):
+    Base.metadata.create_all(bind=engine)
+    raw = generate_games_csv_frame(rows)
+
+    started = time.perf_counter()
+    frame, errors = validate_games_frame(raw)
+    print(f"validation: {rows} rows in {time.perf_counter() - started:.2f}s ({len(errors)} errors)")
+
+    for name in engine_names:
+        db = SessionLocal()
+        try:
+            ingest_engine = get_ingest_engine(db, name)
+            started = time.perf_counter()
+            counts = ingest_engine.write_batch(frame)
+            written = counts['inserted'] + counts['updated'] + counts['unchanged']
+            db.flush()
+            elapsed = time.perf_counter() - started
+            print(f"{name}: {written} rows in {elapsed:.2f}s ({written / elapsed:.0f} rows/s)")
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ingest engines")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--engines", nargs="+", choices=list(INGEST_ENGINES))
+    args = parser.parse_args()
+
+    default_engines = list(INGEST_ENGINES) if is_postgresql(engine) else ['sqlalchemy']
+    benchmark(args.rows, args.engines or default_engines)
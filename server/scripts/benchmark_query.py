@@ -0,0 +1,105 @@
+# Compares the two phase page query with the single joinedload query it replaced, against DATABASE_URL.
+# Load data first, e.g. a synthetic file (server/scripts/synthetic_data.py) through /api/upload_data.
+# --min-tags restricts the pages to tag heavy games, where the joined row set of the old query explodes.
+import argparse
+import statistics
+import time
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from server.db.session import SessionLocal
+from server.models import game_models
+from server.models.pydantic_models import FilterParams, PaginationParams
+from server.models.relationship_models import game_tags
+from server.services.game_service import build_filtered_query, load_games
+
+
+def tag_heavy_ids(min_tags: int):
+    return (
+        select(game_tags.c.game_id)
+        .group_by(game_tags.c.game_id)
+        .having(func.count() >= min_tags)
+    )
+
+
+def joinedload_page(db, ids_query, pagination: PaginationParams):
+    # The previous loader: every collection joined into one row set, DISTINCT and LIMIT over the joined rows
+    return (
+        db.query(game_models.Game)
+        .filter(game_models.Game.id.in_(ids_query))
+        .options(
+            joinedload(game_models.Game.developers),
+            joinedload(game_models.Game.publishers),
+            joinedload(game_models.Game.categories),
+            joinedload(game_models.Game.genres),
+            joinedload(game_models.Game.tags),
+            joinedload(game_models.Game.languages)
+        )
+        .order_by(game_models.Game.id)
+        .distinct()
+        .offset((pagination.page - 1) * pagination.page_size)
+        .limit(pagination.page_size)
+        .all()
+    )
+
+
+def two_phase_page(db, ids_query, pagination: PaginationParams):
+    page_ids = (
+        select(game_models.Game.id)
+        .where(game_models.Game.id.in_(ids_query))
+        .order_by(game_models.Game.id)
+        .offset((pagination.page - 1) * pagination.page_size)
+        .limit(pagination.page_size)
+    )
+    return load_games(db, db.execute(page_ids).scalars().all())
+
+
+def timed(loader, ids_query, pagination: PaginationParams, repeat: int):
+    timings = []
+    games = []
+    for _ in range(repeat):
+        # A fresh session per run, so the identity map does not serve the relationships
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            games = loader(db, ids_query, pagination)
+            timings.append(time.perf_counter() - started)
+            game_ids = [game.id for game in games]
+        finally:
+            db.close()
+    return timings, game_ids
+
+
+def benchmark(args):
+    db = SessionLocal()
+    try:
+        ids_query = build_filtered_query(db, FilterParams(tags=args.tags))
+    finally:
+        db.close()
+    if args.min_tags:
+        ids_query = ids_query.where(game_models.Game.id.in_(tag_heavy_ids(args.min_tags)))
+
+    for page_size in args.page_sizes:
+        for page in args.pages:
+            pagination = PaginationParams(page=page, page_size=page_size)
+            results = {}
+            for name, loader in [('joinedload', joinedload_page), ('two phase', two_phase_page)]:
+                results[name] = timed(loader, ids_query, pagination, args.repeat)
+            if results['joinedload'][1] != results['two phase'][1]:
+                raise RuntimeError(f"Loaders returned different games for page {page} of {page_size}")
+
+            line = ', '.join(
+                f"{name} median {statistics.median(timings) * 1000:.1f}ms"
+                for name, (timings, _) in results.items()
+            )
+            speedup = statistics.median(results['joinedload'][0]) / statistics.median(results['two phase'][0])
+            print(f"page {page} of {page_size} ({len(results['two phase'][1])} games): {line}, {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the /api/query page loaders")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--tags", nargs="+", default=None, help="tag filter of the query")
+    parser.add_argument("--min-tags", type=int, default=15, help="only games with at least this many tags, 0 for all")
+    parser.add_argument("--repeat", type=int, default=5)
+    benchmark(parser.parse_args())
@@ -0,0 +1,85 @@
+# Measures /api/query latency of a running server while it is idle and while it ingests an async upload:
+#   python -m server.scripts.benchmark_query_latency --base-url http://localhost:8000 --file-url https://.../games.csv
+# The p99 during the upload should stay close to the idle p99. Use a query whose result the upload does
+# not change (e.g. --query "app_id=10"), otherwise a growing result skews the comparison.
+import argparse
+import asyncio
+import time
+import aiohttp
+
+FINISHED_STATUSES = {'completed', 'failed', 'partially_completed'}
+
+
+def percentile(latencies, fraction: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(label: str, latencies):
+    if not latencies:
+        print(f"{label}: no requests")
+        return
+    print(
+        f"{label}: {len(latencies)} requests, "
+        f"p50 {percentile(latencies, 0.50) * 1000:.1f}ms, "
+        f"p95 {percentile(latencies, 0.95) * 1000:.1f}ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f}ms, "
+        f"max {max(latencies) * 1000:.1f}ms"
+    )
+
+
+async def query_until(session: aiohttp.ClientSession, url: str, stop: asyncio.Event, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        async with session.get(url) as response:
+            await response.read()
+            response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def measure(session, url: str, concurrency: int, stop: asyncio.Event):
+    latencies = []
+    await asyncio.gather(*(query_until(session, url, stop, latencies) for _ in range(concurrency)))
+    return latencies
+
+
+async def wait_for_task(session, base_url: str, task_id: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        async with session.get(f"{base_url}/api/upload_data_async/status/", params={'task_id': task_id}) as response:
+            task = await response.json()
+        if task['status'] in FINISHED_STATUSES:
+            return task['status']
+        await asyncio.sleep(0.5)
+    return 'timed out'
+
+
+async def run(args):
+    query_url = f"{args.base_url}/api/query?{args.query}"
+    async with aiohttp.ClientSession() as session:
+        stop = asyncio.Event()
+        asyncio.get_running_loop().call_later(args.idle_seconds, stop.set)
+        report('idle', await measure(session, query_url, args.concurrency, stop))
+
+        async with session.post(f"{args.base_url}/api/upload_data_async", json={'file_url': args.file_url}) as response:
+            task_id = (await response.json())['task_id']
+        print(f"Started upload {task_id}")
+
+        stop = asyncio.Event()
+        started = time.perf_counter()
+        queries = asyncio.create_task(measure(session, query_url, args.concurrency, stop))
+        task_status = await wait_for_task(session, args.base_url, task_id, args.timeout)
+        stop.set()
+        print(f"Upload {task_status} after {time.perf_counter() - started:.1f}s")
+        report('during upload', await queries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query latency while an upload is ingested")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--file-url", required=True, help="CSV file to upload, large enough to run a while")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent query clients")
+    parser.add_argument("--query", default="page_size=10", help="query string of the measured /api/query request")
+    parser.add_argument("--idle-seconds", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for the upload")
+    asyncio.run(run(parser.parse_args()))
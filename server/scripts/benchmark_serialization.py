@@ -0,0 +1,81 @@
+# Compares the serialization of /api/query pages: Pydantic models validated and serialized the way
+# FastAPI handles a response_model, against plain dicts encoded with json and with orjson (if installed).
+# Runs against DATABASE_URL, load data first, e.g. a synthetic file (server/scripts/synthetic_data.py).
+import argparse
+import json
+import statistics
+import time
+from fastapi.encoders import jsonable_encoder
+from server.db.session import SessionLocal
+from server.models.pydantic_models import FilterParams, GameResponse, PaginatedResponse, PaginationParams
+from server.services.game_service import game_to_dict, get_filtered_games
+from server.utils import json_utils
+
+
+def page_dict(game_page, pagination: PaginationParams, results) -> dict:
+    return {
+        'page': pagination.page,
+        'page_size': pagination.page_size,
+        'total_pages': game_page.total_pages,
+        'total_records': game_page.total_records,
+        'total_records_estimated': game_page.total_records_estimated,
+        'has_more': game_page.has_more,
+        'next_cursor': game_page.next_cursor,
+        'results': results
+    }
+
+
+def pydantic_response_model(game_page, pagination: PaginationParams) -> bytes:
+    # The previous path: GameResponse per game, PaginatedResponse, then FastAPI validates
+    # the returned model against response_model again and encodes it with json
+    games = [GameResponse(**game_to_dict(game)) for game in game_page.games]
+    response = PaginatedResponse(**page_dict(game_page, pagination, games))
+    validated = PaginatedResponse.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def dicts_json(game_page, pagination: PaginationParams) -> bytes:
+    orjson, json_utils.orjson = json_utils.orjson, None
+    try:
+        return json_utils.dumps(page_dict(game_page, pagination, [game_to_dict(game) for game in game_page.games]))
+    finally:
+        json_utils.orjson = orjson
+
+
+def dicts_orjson(game_page, pagination: PaginationParams) -> bytes:
+    return json_utils.dumps(page_dict(game_page, pagination, [game_to_dict(game) for game in game_page.games]))
+
+
+def benchmark(args):
+    serializers = [('pydantic response_model', pydantic_response_model), ('dicts + json', dicts_json)]
+    if json_utils.orjson is not None:
+        serializers.append(('dicts + orjson', dicts_orjson))
+    else:
+        print("orjson is not installed, skipping it")
+
+    db = SessionLocal()
+    try:
+        for page_size in args.page_sizes:
+            pagination = PaginationParams(page_size=page_size, count='none')
+            game_page = get_filtered_games(db, FilterParams(tags=args.tags), pagination)
+            results = {}
+            for name, serializer in serializers:
+                timings = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    body = serializer(game_page, pagination)
+                    timings.append(time.perf_counter() - started)
+                results[name] = statistics.median(timings)
+            baseline = results['pydantic response_model']
+            line = ', '.join(f"{name} {seconds * 1000:.2f}ms ({baseline / seconds:.1f}x)" for name, seconds in results.items())
+            print(f"{len(game_page.games)} games, {len(body) // 1024}KB: {line}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the serialization of /api/query pages")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--tags", nargs="+", default=None, help="tag filter of the page")
+    parser.add_argument("--repeat", type=int, default=50)
+    benchmark(parser.parse_args())
@@ -1,13 +1,90 @@
 # Create a script called create_tables.py in the root directory
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateColumn
 from server.db.base import Base
-from server.db.session import engine
+from server.db.session import engine, SessionLocal
+from server.services.projection_service import backfill_game_search
+from server.services.search_service import SEARCH_VECTOR_SQL
+from server.utils.db_utils import is_postgresql
+import server.models  # noqa: F401 (registers every table on Base.metadata)
+import server.models.server_models  # noqa: F401
 
 
-def create_tables():
+def create_tables(bind=engine):
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=bind)
     print("Tables created successfully.")
 
 
+def add_missing_columns():
+    # create_all does not alter existing tables, add columns introduced after the table was created
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    print(f"Adding column {table.name}.{column.name}")
+                    column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+
+
+def add_missing_indexes():
+    # Same for indexes added to tables that already exist
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    print(f"Creating index {index.name}")
+                    index.create(bind=connection)
+
+
+def add_search_indexes(bind=engine):
+    # PostgreSQL only, search= falls back to substring matches and the filters to scans elsewhere
+    if not is_postgresql(bind):
+        print("Skipping search indexes, they require PostgreSQL")
+        return
+
+    # Generated column, kept up to date by PostgreSQL on every insert and update of the ingest engines
+    with bind.begin() as connection:
+        print("Creating games.search_vector and its index")
+        connection.exec_driver_sql(
+            f"ALTER TABLE games ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_games_search_vector ON games USING gin (search_vector)"
+        )
+
+    # Trigram indexes serve the ILIKE '%...%' substring filters of name and about_the_game
+    try:
+        with bind.begin() as connection:
+            connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for column in ['name', 'about_the_game']:
+                print(f"Creating trigram index of games.{column}")
+                connection.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_games_{column}_trgm ON games USING gin ({column} gin_trgm_ops)"
+                )
+    except SQLAlchemyError as e:
+        print(f"Skipping trigram indexes, pg_trgm is not available: {e}")
+
+
+def fill_game_search():
+    with SessionLocal() as db:
+        backfill_game_search(db)
+        db.commit()
+
+
 if __name__ == "__main__":
-    create_tables()
\ No newline at end of file
+    create_tables()
+    add_missing_columns()
+    add_missing_indexes()
+    add_search_indexes()
+    fill_game_search()
@@ -0,0 +1,29 @@
+# Runs ingest workers without the API, e.g. with INGEST_JOB_WORKERS=0 on the API servers:
+#   python -m server.scripts.ingest_worker --concurrency 4
+import argparse
+import asyncio
+from server.db.base import Base
+from server.db.session import engine
+from server.services import job_queue
+import server.models  # noqa: F401
+import server.models.server_models  # noqa: F401
+
+
+async def run(concurrency: int):
+    job_queue.start_workers(concurrency)
+    try:
+        await asyncio.gather(*job_queue.workers)
+    finally:
+        await job_queue.stop_workers()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process queued async uploads")
+    parser.add_argument("--concurrency", type=int, default=None, help="defaults to INGEST_JOB_WORKERS")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(run(args.concurrency))
+    except KeyboardInterrupt:
+        print("Ingest workers stopped")
@@ -0,0 +1,65 @@
+# Load test of the query endpoints: concurrent clients request a mix of /api/query, /api/query/facets and
+# /api/upload_data_async/status URLs and report throughput and latency percentiles. Start the server with
+# QUERY_CACHE_BACKEND=none so every request reaches the database, e.g.
+#   QUERY_CACHE_BACKEND=none uvicorn server.main:app --port 8000 --workers 1
+#   python -m server.scripts.load_test http://localhost:8000 --concurrency 50 --seconds 30
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+import aiohttp
+
+PATHS = [
+    '/api/query?page_size=100',
+    '/api/query?page_size=50&sort_by=name&count=estimate',
+    '/api/query?tags=Indie&match=exact&page_size=20',
+    '/api/query?search=game&page_size=20&count=none',
+    '/api/query?price_max=10&positive_reviews_min=1000&fields=name,price',
+    '/api/query/facets?tags=Indie&match=exact&facets=genres',
+    '/api/upload_data_async/status/?task_id=unknown',
+    '/api/health',
+]
+
+
+async def client(session: aiohttp.ClientSession, base_url: str, paths, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        path = next(paths)
+        started = time.perf_counter()
+        try:
+            async with session.get(base_url + path) as response:
+                await response.read()
+                if response.status >= 500:
+                    errors.append(f"{response.status} {path}")
+        except aiohttp.ClientError as e:
+            errors.append(f"{type(e).__name__} {path}")
+        latencies.append(time.perf_counter() - started)
+
+
+async def load_test(args):
+    paths = itertools.cycle(PATHS)
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        await asyncio.gather(*[
+            client(session, args.base_url.rstrip('/'), paths, deadline, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{len(latencies)} requests in {elapsed:.1f}s with {args.concurrency} clients: {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency p50 {quantiles[49] * 1000:.0f}ms, p95 {quantiles[94] * 1000:.0f}ms, p99 {quantiles[98] * 1000:.0f}ms")
+    print(f"{len(errors)} errors" + (f", first: {errors[0]}" if errors else ''))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the query endpoints of a running server")
+    parser.add_argument("base_url", help="e.g. http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(load_test(parser.parse_args()))
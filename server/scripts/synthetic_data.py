@@ -0,0 +1,53 @@
+# Generates a synthetic Steam style CSV for benchmarks and local load testing
+import argparse
+import random
+import pandas as pd
+
+TAGS = [
+    'Action', 'Indie', 'Adventure', 'Casual', 'Strategy', 'RPG', 'Simulation', 'Puzzle', 'Action RPG',
+    'Action-Adventure', 'Free to Play', 'Multiplayer', 'Singleplayer', 'Open World', 'Pixel Graphics',
+    'Platformer', 'Sci-fi', 'Horror', 'Survival', 'Sports', 'Racing', 'Co-op', 'Story Rich', 'Atmospheric',
+]
+GENRES = ['Action', 'Indie', 'Adventure', 'Casual', 'Strategy', 'RPG', 'Simulation', 'Sports', 'Racing']
+CATEGORIES = ['Single-player', 'Multi-player', 'Steam Achievements', 'Steam Cloud', 'Full controller support']
+LANGUAGES = ['English', 'French', 'German', 'Spanish - Spain', 'Japanese', 'Russian', 'Simplified Chinese']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def generate_games_csv_frame(rows: int, seed: int = 0, start_app_id: int = 10) -> pd.DataFrame:
+    rng = random.Random(seed)
+    records = []
+    for index in range(rows):
+        records.append({
+            'AppID': str(start_app_id + index),
+            'Name': f'Synthetic Game {index}',
+            'Release date': f'{rng.choice(MONTHS)} {rng.randint(1, 28)}, {rng.randint(2000, 2024)}',
+            'Estimated owners': '0 - 20000',
+            'Required age': str(rng.choice([0, 0, 0, 12, 18])),
+            'Price': f'{rng.choice([0, 0.99, 4.99, 9.99, 19.99, 59.99])}',
+            'DLC count': str(rng.randint(0, 10)),
+            'About the game': ' '.join(rng.choice(TAGS) for _ in range(rng.randint(20, 200))),
+            'Supported languages': str(rng.sample(LANGUAGES, rng.randint(1, 5))),
+            'Windows': 'TRUE',
+            'Mac': rng.choice(['TRUE', 'FALSE']),
+            'Linux': rng.choice(['TRUE', 'FALSE', 'FALSE']),
+            'Positive': str(rng.randint(0, 100000)),
+            'Negative': str(rng.randint(0, 10000)),
+            'Score rank': str(rng.randint(1, 100)) if rng.random() < 0.05 else '',
+            'Developers': ', '.join(f'Developer {rng.randint(0, rows // 3 + 1)}' for _ in range(rng.randint(1, 2))),
+            'Publishers': f'Publisher {rng.randint(0, rows // 10 + 1)}',
+            'Categories': ','.join(rng.sample(CATEGORIES, rng.randint(1, 4))),
+            'Genres': ','.join(rng.sample(GENRES, rng.randint(1, 3))),
+            'Tags': ','.join(rng.sample(TAGS, rng.randint(3, 20))),
+        })
+    return pd.DataFrame.from_records(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic games CSV")
+    parser.add_argument("output")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_games_csv_frame(args.rows, args.seed).to_csv(args.output, index=False)
+    print(f"Wrote {args.rows} rows to {args.output}")
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from server.models.server_models import DatasetVersion
+from server.utils.db_utils import dialect_insert
+
+DATASET_VERSION_ID = 1
+
+
+class LRUCache:
+    """Thread safe LRU cache, entries also expire ttl seconds after they were stored."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class NullCache:
+    """Backend that stores nothing, disables a cache."""
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        pass
+
+    def clear(self):
+        pass
+
+
+# Cache backends by name, each takes the maximum number of entries and their time to live
+CACHE_BACKENDS = {
+    'memory': LRUCache,
+    'none': lambda maxsize, ttl: NullCache(),
+}
+
+
+def create_cache(backend: str, maxsize: int, ttl: float):
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    return CACHE_BACKENDS[backend](maxsize, ttl)
+
+
+def get_dataset_version(db: Session) -> int:
+    """
+    Version of the game data, part of the key of everything cached from it.
+
+    Stored in the database, so an ingest committed by any server or worker
+    process invalidates the caches of all of them.
+    """
+    version = db.execute(
+        select(DatasetVersion.version).where(DatasetVersion.id == DATASET_VERSION_ID)
+    ).scalar()
+    return version or 0
+
+
+def bump_dataset_version(db: Session):
+    # Runs in the transaction of the ingest batch, readers see the new version together with its rows
+    statement = dialect_insert(db.bind, DatasetVersion).values(id=DATASET_VERSION_ID, version=1)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[DatasetVersion.id],
+        set_={'version': DatasetVersion.version + 1}
+    ))
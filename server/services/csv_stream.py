@@ -0,0 +1,273 @@
+import asyncio
+import io
+import os
+from concurrent.futures import Executor
+from typing import Optional
+import aiohttp
+import pandas as pd
+from server.config import settings
+
+END_OF_STREAM = None
+
+
+def range_start(response: aiohttp.ClientResponse) -> Optional[int]:
+    # Content-Range: bytes <start>-<end>/<size>
+    content_range = response.headers.get('Content-Range', '')
+    unit, _, byte_range = content_range.partition(' ')
+    start = byte_range.partition('-')[0]
+    return int(start) if unit == 'bytes' and start.isdigit() else None
+
+
+def remove_spool_files(spool_path: str):
+    for path in (spool_path, spool_path + '.part'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class StreamingBodyReader(io.RawIOBase):
+    """
+    Blocking file-like view over a response body that is downloaded on the event loop.
+
+    The CSV parser runs in a worker thread and pulls byte chunks from a bounded
+    asyncio queue, so only a few download chunks are held in memory at any time.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self._queue = queue
+        self._loop = loop
+        self._pending = memoryview(b'')
+        self._finished = False
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._finished:
+            chunk = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+            if isinstance(chunk, BaseException):
+                raise chunk
+            if chunk is END_OF_STREAM:
+                self._finished = True
+            else:
+                self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self.bytes_read += size
+        return size
+
+
+class CountingFileReader(io.RawIOBase):
+    """Raw reader over a local file, or its first limit bytes, that counts the bytes handed to the parser."""
+
+    def __init__(self, path: str, limit: Optional[int] = None):
+        self._file = open(path, 'rb', buffering=0)
+        self._limit = limit
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._limit is not None:
+            buffer = memoryview(buffer)[:max(0, self._limit - self.bytes_read)]
+            if not len(buffer):
+                return 0
+        size = self._file.readinto(buffer)
+        self.bytes_read += size
+        return size
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class ConcatenatedReader(io.RawIOBase):
+    """Raw reader returning the bytes of its readers one after the other."""
+
+    def __init__(self, *readers: io.RawIOBase):
+        self._readers = list(readers)
+        self._current = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._current < len(self._readers):
+            size = self._readers[self._current].readinto(buffer)
+            if size:
+                return size
+            self._current += 1
+        return 0
+
+    @property
+    def bytes_read(self) -> int:
+        return sum(reader.bytes_read for reader in self._readers)
+
+    def close(self):
+        for reader in self._readers:
+            reader.close()
+        super().close()
+
+
+class CSVChunkStream:
+    """
+    Async iterator over DataFrame chunks of a remote CSV file.
+
+    The body is read incrementally and parsed with a chunked pandas reader, a
+    chunk is only parsed when the previous one has been consumed. Chunks keep
+    the row numbers of the original file in their index.
+
+    When a spool path is given the downloaded bytes are also written to disk, so
+    a resumed ingest can re-read the file locally. A download that was interrupted
+    continues after the bytes spooled so far with a Range request, or from the
+    start when the server does not support ranges. Rows before skip_rows are
+    parsed but dropped without being returned. Parsing runs on the given
+    executor, the default executor of the loop when none is given.
+    """
+
+    def __init__(
+            self,
+            file_url: str,
+            chunk_size: Optional[int] = None,
+            skip_rows: int = 0,
+            spool_path: Optional[str] = None,
+            executor: Optional[Executor] = None
+    ):
+        self.file_url = file_url
+        self.chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+        self.skip_rows = skip_rows
+        self.spool_path = spool_path
+        self.executor = executor
+        self.bytes_received = 0
+        self.bytes_total = None
+        # File rows parsed so far (skipped rows included) and whether the file was read completely
+        self.rows_read = 0
+        self.exhausted = False
+        self._raw = None
+        self._session = None
+        self._response = None
+        self._queue = asyncio.Queue(maxsize=settings.DOWNLOAD_QUEUE_SIZE)
+        self._download = None
+        self._spool = None
+        self._reader = None
+        self._parsing = None
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        try:
+            if self.spool_path and os.path.exists(self.spool_path):
+                print(f"Reading {self.file_url} from local copy {self.spool_path}")
+                self.bytes_total = self.bytes_received = os.path.getsize(self.spool_path)
+                self._raw = CountingFileReader(self.spool_path)
+            else:
+                part_path = self.spool_path + '.part' if self.spool_path else None
+                offset = os.path.getsize(part_path) if part_path and os.path.exists(part_path) else 0
+                self._session = aiohttp.ClientSession()
+                offset = await self._request(offset)
+                self.bytes_received = offset
+                if self._response.content_length is not None:
+                    self.bytes_total = offset + self._response.content_length
+                if self.spool_path:
+                    os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+                    self._spool = open(part_path, 'ab' if offset else 'wb')
+
+                self._download = asyncio.create_task(self._feed())
+                self._raw = StreamingBodyReader(self._queue, loop)
+                if offset:
+                    print(f"Resuming the download of {self.file_url} after the {offset} bytes of {part_path}")
+                    # The spooled bytes are parsed first, the spool grows behind the limit
+                    self._raw = ConcatenatedReader(CountingFileReader(part_path, limit=offset), self._raw)
+            source = io.BufferedReader(self._raw)
+
+            # Creating the reader already consumes the header, so it has to happen off the loop too
+            self._reader = await self._parse(
+                lambda: pd.read_csv(source, sep=',', dtype=str, chunksize=self.chunk_size)
+            )
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._download is not None:
+            self._download.cancel()
+            # Release a parser thread that might still be waiting for data
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(END_OF_STREAM)
+        if self._parsing is not None:
+            # The reader can only be closed once the parser thread let go of it
+            await asyncio.gather(self._parsing, return_exceptions=True)
+        if self._spool is not None:
+            self._spool.close()
+        if self._reader is not None:
+            self._reader.close()
+        if self._raw is not None:
+            self._raw.close()
+        if self._response is not None:
+            self._response.release()
+        if self._session is not None:
+            await self._session.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> pd.DataFrame:
+        while True:
+            chunk = await self._parse(next, self._reader, None)
+            if chunk is None:
+                self.exhausted = True
+                raise StopAsyncIteration
+            self.rows_read = int(chunk.index[-1]) + 1
+            # Rows that were committed by a previous run
+            if chunk.index[-1] >= self.skip_rows:
+                return chunk[chunk.index >= self.skip_rows]
+
+    async def _parse(self, func, *args):
+        # Shielded, a cancelled ingest leaves the thread running and __aexit__ waits for it
+        self._parsing = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        return await asyncio.shield(self._parsing)
+
+    @property
+    def bytes_read(self) -> int:
+        return self._raw.bytes_read if self._raw is not None else 0
+
+    def remove_spool(self):
+        if self.spool_path:
+            remove_spool_files(self.spool_path)
+
+    async def _request(self, offset: int) -> int:
+        """Sends the download request, returns the offset in the file the response body starts at."""
+        headers = {'Range': f'bytes={offset}-'} if offset else None
+        self._response = await self._session.get(self.file_url, headers=headers)
+        if offset and self._response.status == 206 and range_start(self._response) == offset:
+            return offset
+        if self._response.status == 200:
+            return 0
+        if offset:
+            # e.g. 416 when the spool already holds the whole file, download it again
+            print(f"Could not resume the download of {self.file_url} (HTTP {self._response.status}), starting over")
+            self._response.release()
+            return await self._request(0)
+        raise Exception(f"Failed to download file: HTTP {self._response.status}")
+
+    async def _feed(self):
+        loop = asyncio.get_running_loop()
+        try:
+            async for data in self._response.content.iter_chunked(settings.DOWNLOAD_CHUNK_BYTES):
+                self.bytes_received += len(data)
+                if self._spool is not None:
+                    await loop.run_in_executor(None, self._spool.write, data)
+                await self._queue.put(data)
+            if self._spool is not None:
+                self._spool.close()
+                os.replace(self.spool_path + '.part', self.spool_path)
+            await self._queue.put(END_OF_STREAM)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._queue.put(e)
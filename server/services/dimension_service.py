@@ -0,0 +1,163 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+import pandas as pd
+from sqlalchemy import select, delete, bindparam
+from sqlalchemy.orm import Session
+from server.models.game_models import Developer, Publisher, Category, Genre, Tag, Language
+from server.services.cache_service import get_dataset_version
+from server.models.relationship_models import (
+    game_developers,
+    game_publishers,
+    game_categories,
+    game_genres,
+    game_tags,
+    game_languages,
+)
+from server.utils.db_utils import dialect_insert, chunked
+
+# Dimension key (as produced by validate_games_frame) -> (model, association table, association column)
+DIMENSIONS = {
+    'developers': (Developer, game_developers, 'developer_id'),
+    'publishers': (Publisher, game_publishers, 'publisher_id'),
+    'categories': (Category, game_categories, 'category_id'),
+    'genres': (Genre, game_genres, 'genre_id'),
+    'tags': (Tag, game_tags, 'tag_id'),
+    'languages': (Language, game_languages, 'language_id'),
+}
+
+
+class DimensionResolver:
+    """
+    Resolves dimension names to ids for the duration of one ingest.
+
+    Known ids are cached per dimension, so every name costs at most one lookup
+    and unknown names are created in bulk instead of one flush per entity.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.ids: Dict[str, Dict[str, int]] = {key: {} for key in DIMENSIONS}
+
+    def resolve(self, key: str, names: Iterable[str]) -> Dict[str, int]:
+        model = DIMENSIONS[key][0]
+        known = self.ids[key]
+        missing = sorted({name for name in names if name not in known})
+        if not missing:
+            return known
+
+        self._load_existing(model, known, missing)
+        to_create = [name for name in missing if name not in known]
+        if to_create:
+            statement = (
+                dialect_insert(self.db.bind, model.__table__)
+                .on_conflict_do_nothing(index_elements=['name'])
+                .returning(model.id, model.name)
+            )
+            result = self.db.execute(statement, [{'name': name} for name in to_create])
+            known.update({name: entity_id for entity_id, name in result})
+            # Names created concurrently by another ingest are not returned by DO NOTHING
+            self._load_existing(model, known, [name for name in to_create if name not in known])
+        return known
+
+    def clear(self):
+        # Ids created inside a rolled back savepoint no longer exist, they are looked up again
+        for known in self.ids.values():
+            known.clear()
+
+    def _load_existing(self, model, known: Dict[str, int], names: List[str]):
+        for chunk in chunked(names):
+            rows = self.db.execute(select(model.id, model.name).where(model.name.in_(chunk)))
+            known.update({name: entity_id for entity_id, name in rows})
+
+    def write_associations(self, frame: pd.DataFrame, game_ids: List[int], replace: bool = False) -> int:
+        """
+        Link every game in the frame to its dimensions with bulk inserts, returns the number of links added.
+
+        With replace the existing links of these games are diffed against the
+        frame: links it no longer lists are deleted and only new ones inserted.
+        """
+        added = 0
+        for key, (_, table, column) in DIMENSIONS.items():
+            name_lists = frame[key].tolist()
+            ids = self.resolve(key, (name for names in name_lists for name in names))
+            pairs = {
+                (game_id, ids[name])
+                for game_id, names in zip(game_ids, name_lists)
+                for name in names
+            }
+            if replace:
+                existing = set()
+                for chunk in chunked(list(set(game_ids))):
+                    rows = self.db.execute(
+                        select(table.c.game_id, table.c[column]).where(table.c.game_id.in_(chunk))
+                    )
+                    existing.update(tuple(row) for row in rows)
+                removed = existing - pairs
+                if removed:
+                    statement = delete(table).where(
+                        table.c.game_id == bindparam('b_game_id'),
+                        table.c[column] == bindparam('b_entity_id'),
+                    )
+                    self.db.execute(
+                        statement,
+                        [{'b_game_id': game_id, 'b_entity_id': entity_id} for game_id, entity_id in removed]
+                    )
+                pairs -= existing
+            if not pairs:
+                continue
+            # Links that already exist are not returned by DO NOTHING
+            statement = dialect_insert(self.db.bind, table).on_conflict_do_nothing().returning(table.c.game_id)
+            result = self.db.execute(
+                statement, [{'game_id': game_id, column: entity_id} for game_id, entity_id in pairs]
+            )
+            added += len(result.all())
+        return added
+
+
+class DimensionDictionary:
+    """
+    In-process copy of the dimension names, resolves exact and prefix filter values to
+    ids without string matching in SQL. Reloaded by the first lookup after an ingest
+    changed the dataset version.
+    """
+
+    def __init__(self):
+        self.version = None
+        # Dimension key -> (case folded name, id) pairs in sorted order
+        self.names: Dict[str, List[Tuple[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, db: Session, key: str, values: Iterable[str], match: str) -> List[int]:
+        names = self._load(db)[key]
+        ids = set()
+        for value in values:
+            value = value.casefold()
+            position = bisect_left(names, (value,))
+            while position < len(names):
+                name, entity_id = names[position]
+                if name != value if match == 'exact' else not name.startswith(value):
+                    break
+                ids.add(entity_id)
+                position += 1
+        return sorted(ids)
+
+    def _load(self, db: Session) -> Dict[str, List[Tuple[str, int]]]:
+        version = get_dataset_version(db)
+        with self._lock:
+            if version == self.version:
+                return self.names
+        # Read outside the lock: on an AsyncSession the queries yield to the event loop,
+        # other requests of the same thread must not block on the lock meanwhile
+        names = {
+            key: sorted((name.casefold(), entity_id) for entity_id, name in db.execute(select(model.id, model.name)))
+            for key, (model, _, _) in DIMENSIONS.items()
+        }
+        with self._lock:
+            if self.version is None or version > self.version:
+                self.names = names
+                self.version = version
+        return names
+
+
+dimension_dictionary = DimensionDictionary()
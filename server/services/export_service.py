@@ -0,0 +1,196 @@
+import csv
+import io
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from server.db.session import read_session_factory
+from server.models import game_models
+from server.models.pydantic_models import FilterParams
+from server.services.dimension_service import DIMENSIONS
+from server.services.game_service import GAME_FIELDS, RELATIONSHIP_FIELDS, SCALAR_FIELD_COLUMNS, build_filtered_query
+from server.utils import json_utils
+
+# Optional, only needed for Parquet exports
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+PLATFORMS = ['windows', 'mac', 'linux']
+
+
+def collection_names(db: Session, dimension: str, game_ids: List[int]) -> Dict[int, List[str]]:
+    """Names of one dimension (e.g. tags) of the games by game id."""
+    model, association, column = DIMENSIONS[dimension]
+    rows = db.connection().execute(
+        select(association.c.game_id, model.name)
+        .join(model, model.id == association.c[column])
+        .where(association.c.game_id.in_(game_ids))
+    ).all()
+    names = defaultdict(list)
+    for game_id, name in rows:
+        names[game_id].append(name)
+    return names
+
+
+def game_batches(db: Session, filters: FilterParams, fields: List[str], batch_size: int) -> Iterator[List[dict]]:
+    """
+    The games matching the filters in id order, as response dicts of at most batch_size games.
+
+    Rows are read in one pass through a server-side cursor (PostgreSQL). The collections of
+    every batch are read with one IN (...) query each, as plain rows instead of ORM objects.
+    """
+    columns = [game_models.Game.id, *(column for field in fields for column in SCALAR_FIELD_COLUMNS.get(field, []))]
+    statement = (
+        build_filtered_query(db, filters)
+        .with_only_columns(*columns)
+        .order_by(game_models.Game.id)
+        .execution_options(yield_per=batch_size)
+    )
+    collections = [field for field in fields if field in RELATIONSHIP_FIELDS]
+    # Executed on the connection, plain rows skip the ORM result processing
+    for rows in db.connection().execute(statement).partitions():
+        game_ids = [row.id for row in rows]
+        names = {
+            field: collection_names(db, RELATIONSHIP_FIELDS[field].key, game_ids) for field in collections
+        }
+        # Rows have the attributes of Game read by GAME_FIELDS
+        yield [
+            {field: names[field].get(row.id, []) if field in names else GAME_FIELDS[field](row) for field in fields}
+            for row in rows
+        ]
+
+
+def ndjson_chunks(batches: Iterator[List[dict]], fields: List[str]) -> Iterator[bytes]:
+    for games in batches:
+        yield b''.join(json_utils.dumps(game) + b'\n' for game in games)
+
+
+def csv_value(value):
+    # Collections are comma separated like in the ingested CSV files
+    if isinstance(value, list):
+        return ','.join(value)
+    return value
+
+
+def csv_chunks(batches: Iterator[List[dict]], fields: List[str]) -> Iterator[bytes]:
+    # platforms is split into one column per platform
+    header = [column for field in fields for column in (PLATFORMS if field == 'platforms' else [field])]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for games in batches:
+        for game in games:
+            row = []
+            for field in fields:
+                if field == 'platforms':
+                    row.extend(game[field][platform] for platform in PLATFORMS)
+                else:
+                    row.append(csv_value(game[field]))
+            writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def parquet_schema(fields: List[str]):
+    names = pyarrow.list_(pyarrow.string())
+    types = {
+        'app_id': pyarrow.int32(),
+        'name': pyarrow.string(),
+        'release_date': pyarrow.date32(),
+        'required_age': pyarrow.int16(),
+        'price': pyarrow.float64(),
+        'dlc_count': pyarrow.int32(),
+        'about_the_game': pyarrow.string(),
+        'supported_languages': names,
+        'platforms': pyarrow.struct([(platform, pyarrow.bool_()) for platform in PLATFORMS]),
+        'positive_reviews': pyarrow.int32(),
+        'negative_reviews': pyarrow.int32(),
+        'score_rank': pyarrow.int32(),
+        'developers': names,
+        'publishers': names,
+        'categories': names,
+        'genres': names,
+        'tags': names,
+    }
+    return pyarrow.schema([(field, types[field]) for field in fields])
+
+
+class ChunkSink:
+    """Write only file object, collects what the Parquet writer wrote since the last drain."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_chunks(batches: Iterator[List[dict]], fields: List[str]) -> Iterator[bytes]:
+    # One row group per batch, written to the response as soon as it is complete
+    schema = parquet_schema(fields)
+    sink = ChunkSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for games in batches:
+            writer.write_table(pyarrow.Table.from_pylist(games, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+class ExportFormat(NamedTuple):
+    media_type: str
+    extension: str
+    chunks: Callable[[Iterator[List[dict]], List[str]], Iterator[bytes]]
+    available: Callable[[], bool] = lambda: True
+
+
+# Export formats by name
+EXPORT_FORMATS = {
+    'ndjson': ExportFormat('application/x-ndjson', 'ndjson', ndjson_chunks),
+    'csv': ExportFormat('text/csv', 'csv', csv_chunks),
+    'parquet': ExportFormat('application/vnd.apache.parquet', 'parquet', parquet_chunks, lambda: pyarrow is not None),
+}
+
+
+def export_games(
+    filters: FilterParams,
+    fields: Optional[List[str]],
+    export_format: ExportFormat,
+    batch_size: int
+) -> Iterator[bytes]:
+    """
+    The encoded export of the games matching the filters, streamed batch by batch.
+
+    Uses its own session, the response body is sent after the request's dependencies are closed.
+    """
+    fields = fields or list(GAME_FIELDS)
+    db = read_session_factory()()
+    try:
+        for chunk in export_format.chunks(game_batches(db, filters, fields, batch_size), fields):
+            if chunk:
+                yield chunk
+    finally:
+        db.close()
@@ -0,0 +1,64 @@
+from typing import Dict, List
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from server.config import settings
+from server.models import game_models
+from server.models.pydantic_models import FilterParams
+from server.services.cache_service import LRUCache, get_dataset_version
+from server.services.dimension_service import DIMENSIONS
+from server.services.game_service import RELATIONSHIP_FIELDS, build_filtered_query, filters_key
+
+PLATFORMS = ['windows', 'mac', 'linux']
+
+# Facet counts keyed by (dataset version, normalized filters, facet, limit)
+facet_cache = LRUCache(settings.QUERY_FACET_CACHE_SIZE, settings.QUERY_FACET_CACHE_SECONDS)
+
+
+def dimension_counts(db: Session, filters: FilterParams, facet: str, limit: int) -> List[dict]:
+    """The limit most frequent names of a dimension (e.g. tags) among the filtered games, one grouped query."""
+    model, association, column = DIMENSIONS[RELATIONSHIP_FIELDS[facet].key]
+    filtered = build_filtered_query(db, filters).subquery()
+    dimension_id = association.c[column]
+    # Top ids are counted on the association table alone, names are joined to the limit rows only
+    top = (
+        select(dimension_id.label('id'), func.count().label('count'))
+        .join(filtered, filtered.c.id == association.c.game_id)
+        .group_by(dimension_id)
+        .order_by(func.count().desc(), dimension_id)
+        .limit(limit)
+        .subquery()
+    )
+    rows = db.execute(
+        select(model.name, top.c.count)
+        .join(top, top.c.id == model.id)
+        .order_by(top.c.count.desc(), top.c.id)
+    )
+    return [{'name': name, 'count': count} for name, count in rows]
+
+
+def platform_counts(db: Session, filters: FilterParams) -> List[dict]:
+    # Platforms are columns of games, counted in one pass over the filtered games
+    columns = [getattr(game_models.Game, platform) for platform in PLATFORMS]
+    counts = db.execute(
+        build_filtered_query(db, filters).with_only_columns(
+            *[func.coalesce(func.sum(case((column, 1), else_=0)), 0) for column in columns]
+        )
+    ).one()
+    return sorted(
+        [{'name': platform, 'count': count} for platform, count in zip(PLATFORMS, counts)],
+        key=lambda facet: -facet['count']
+    )
+
+
+def get_facets(db: Session, filters: FilterParams, facets: List[str], limit: int) -> Dict[str, List[dict]]:
+    """Counts of the games matching the filters per value of every requested facet, most frequent first."""
+    version = get_dataset_version(db)
+    key = filters_key(filters)
+    result = {}
+    for facet in facets:
+        counts = facet_cache.get((version, key, facet, limit))
+        if counts is None:
+            counts = platform_counts(db, filters) if facet == 'platforms' else dimension_counts(db, filters, facet, limit)
+            facet_cache.set((version, key, facet, limit), counts)
+        result[facet] = counts
+    return result
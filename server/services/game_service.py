@@ -1,114 +1,366 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
-from typing import List
+import json
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy import func, select, tuple_, Select
+from typing import List, NamedTuple, Optional
+from server.config import settings
 from server.models import game_models
-from server.utils.query_utils import apply_platform_filters, apply_multi_value_filters
-from server.models.pydantic_models import FilterParams, PaginationParams
+from server.services.cache_service import LRUCache, get_dataset_version
+from server.services.dimension_service import DIMENSIONS, dimension_dictionary
+from server.services.projection_service import PROJECTION_COLUMNS
+from server.services.search_service import search_condition, search_rank
+from server.utils.db_utils import explain_plan, is_postgresql
+from server.utils.query_utils import (
+    apply_platform_filters,
+    apply_multi_value_filters,
+    matching_dimension_ids,
+    encode_cursor,
+    decode_cursor
+)
+from server.models.pydantic_models import FieldParams, FilterParams, PaginationParams
 
-def get_filtered_games(
-    db: Session,
-    filters: FilterParams,
-    pagination: PaginationParams
-):
-    query = db.query(game_models.Game)
+# Sortable (not nullable) columns, games.id is appended as tie breaker so every position is unique
+SORT_COLUMNS = {
+    'id': game_models.Game.id,
+    'app_id': game_models.Game.app_id,
+    'name': game_models.Game.name,
+    'release_date': game_models.Game.release_date,
+    'price': game_models.Game.price,
+}
+
+# Response fields of a game in the order of GameResponse, with the value of each
+GAME_FIELDS = {
+    'app_id': lambda game: game.app_id,
+    'name': lambda game: game.name,
+    'release_date': lambda game: game.release_date,
+    'required_age': lambda game: game.required_age,
+    'price': lambda game: float(game.price),
+    'dlc_count': lambda game: game.dlc_count,
+    'about_the_game': lambda game: game.about_the_game,
+    'supported_languages': lambda game: [language.name for language in game.languages],
+    'platforms': lambda game: {'windows': game.windows, 'mac': game.mac, 'linux': game.linux},
+    'positive_reviews': lambda game: game.positive,
+    'negative_reviews': lambda game: game.negative,
+    'score_rank': lambda game: game.score_rank,
+    'developers': lambda game: [developer.name for developer in game.developers],
+    'publishers': lambda game: [publisher.name for publisher in game.publishers],
+    'categories': lambda game: [category.name for category in game.categories],
+    'genres': lambda game: [genre.name for genre in game.genres],
+    'tags': lambda game: [tag.name for tag in game.tags],
+}
+
+# Columns loaded for the scalar fields and relationships loaded for the collection fields
+SCALAR_FIELD_COLUMNS = {
+    'app_id': [game_models.Game.app_id],
+    'name': [game_models.Game.name],
+    'release_date': [game_models.Game.release_date],
+    'required_age': [game_models.Game.required_age],
+    'price': [game_models.Game.price],
+    'dlc_count': [game_models.Game.dlc_count],
+    'about_the_game': [game_models.Game.about_the_game],
+    'platforms': [game_models.Game.windows, game_models.Game.mac, game_models.Game.linux],
+    'positive_reviews': [game_models.Game.positive],
+    'negative_reviews': [game_models.Game.negative],
+    'score_rank': [game_models.Game.score_rank],
+}
+RELATIONSHIP_FIELDS = {
+    'supported_languages': game_models.Game.languages,
+    'developers': game_models.Game.developers,
+    'publishers': game_models.Game.publishers,
+    'categories': game_models.Game.categories,
+    'genres': game_models.Game.genres,
+    'tags': game_models.Game.tags,
+}
+
+# Exact counts keyed by (dataset version, normalized filters)
+count_cache = LRUCache(settings.QUERY_COUNT_CACHE_SIZE, settings.QUERY_COUNT_CACHE_SECONDS)
+
+
+class GamePage(NamedTuple):
+    games: List[game_models.Game]
+    total_records: Optional[int]
+    total_pages: Optional[int]
+    total_records_estimated: bool
+    has_more: bool
+    next_cursor: Optional[str]
+
+
+def sort_columns(db: Session, filters: FilterParams, pagination: PaginationParams) -> list:
+    if pagination.sort_by == 'relevance':
+        if filters.search is None:
+            raise ValueError("sort_by=relevance requires search")
+        # Negated, so the ascending order lists the best matches first
+        return [-search_rank(db.bind, filters.search), game_models.Game.id]
+    column = SORT_COLUMNS[pagination.sort_by]
+    return [game_models.Game.id] if column is game_models.Game.id else [column, game_models.Game.id]
+
+
+def encode_position(values: list, pagination: PaginationParams) -> str:
+    return encode_cursor({
+        'sort_by': pagination.sort_by,
+        'sort_order': pagination.sort_order,
+        'key': [value.isoformat() if isinstance(value, date) else str(value) for value in values]
+    })
+
+
+def decode_position(cursor: str, pagination: PaginationParams, columns: list) -> list:
+    position = decode_cursor(cursor)
+    if position.get('sort_by') != pagination.sort_by or position.get('sort_order') != pagination.sort_order:
+        raise ValueError("Cursor does not match sort_by and sort_order")
+    key = position.get('key')
+    if not isinstance(key, list) or len(key) != len(columns):
+        raise ValueError("Invalid cursor")
+    try:
+        return [
+            date.fromisoformat(value) if column.type.python_type is date else column.type.python_type(value)
+            for column, value in zip(columns, key)
+        ]
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError("Invalid cursor")
+
+
+def build_filtered_query(db: Session, filters: FilterParams) -> Select:
+    """Select of the ids of the games matching the filters."""
+    query = select(game_models.Game.id)
+
+    # Full text search
+    if filters.search is not None:
+        query = query.where(search_condition(db.bind, filters.search))
 
     # Numeric exact matches
     if filters.app_id is not None:
-        query = query.filter(game_models.Game.app_id == filters.app_id)
+        query = query.where(game_models.Game.app_id == filters.app_id)
     if filters.required_age is not None:
-        query = query.filter(game_models.Game.required_age == filters.required_age)
+        query = query.where(game_models.Game.required_age == filters.required_age)
     if filters.price is not None:
-        query = query.filter(game_models.Game.price == filters.price)
+        query = query.where(game_models.Game.price == filters.price)
     if filters.dlc_count is not None:
-        query = query.filter(game_models.Game.dlc_count == filters.dlc_count)
+        query = query.where(game_models.Game.dlc_count == filters.dlc_count)
     if filters.positive_reviews is not None:
-        query = query.filter(game_models.Game.positive == filters.positive_reviews)
+        query = query.where(game_models.Game.positive == filters.positive_reviews)
     if filters.negative_reviews is not None:
-        query = query.filter(game_models.Game.negative == filters.negative_reviews)
+        query = query.where(game_models.Game.negative == filters.negative_reviews)
     if filters.score_rank is not None:
-        query = query.filter(game_models.Game.score_rank == filters.score_rank)
+        query = query.where(game_models.Game.score_rank == filters.score_rank)
 
     # String substring matches
     if filters.name is not None:
-        query = query.filter(game_models.Game.name.ilike(f'%{filters.name}%'))
+        query = query.where(game_models.Game.name.ilike(f'%{filters.name}%'))
     if filters.about_the_game is not None:
-        query = query.filter(game_models.Game.about_the_game.ilike(f'%{filters.about_the_game}%'))
+        query = query.where(game_models.Game.about_the_game.ilike(f'%{filters.about_the_game}%'))
 
     # Date exact match
     if filters.release_date is not None:
-        query = query.filter(game_models.Game.release_date == filters.release_date)
+        query = query.where(game_models.Game.release_date == filters.release_date)
 
     # Range queries
     if filters.release_date_min is not None:
-        query = query.filter(game_models.Game.release_date >= filters.release_date_min)
+        query = query.where(game_models.Game.release_date >= filters.release_date_min)
     if filters.release_date_max is not None:
-        query = query.filter(game_models.Game.release_date <= filters.release_date_max)
+        query = query.where(game_models.Game.release_date <= filters.release_date_max)
 
     if filters.price_min is not None:
-        query = query.filter(game_models.Game.price >= filters.price_min)
+        query = query.where(game_models.Game.price >= filters.price_min)
     if filters.price_max is not None:
-        query = query.filter(game_models.Game.price <= filters.price_max)
+        query = query.where(game_models.Game.price <= filters.price_max)
 
     if filters.positive_reviews_min is not None:
-        query = query.filter(game_models.Game.positive >= filters.positive_reviews_min)
+        query = query.where(game_models.Game.positive >= filters.positive_reviews_min)
     if filters.positive_reviews_max is not None:
-        query = query.filter(game_models.Game.positive <= filters.positive_reviews_max)
+        query = query.where(game_models.Game.positive <= filters.positive_reviews_max)
 
     if filters.negative_reviews_min is not None:
-        query = query.filter(game_models.Game.negative >= filters.negative_reviews_min)
+        query = query.where(game_models.Game.negative >= filters.negative_reviews_min)
     if filters.negative_reviews_max is not None:
-        query = query.filter(game_models.Game.negative <= filters.negative_reviews_max)
+        query = query.where(game_models.Game.negative <= filters.negative_reviews_max)
 
     # Platforms
     if filters.platforms is not None:
         query = apply_platform_filters(query, filters.platforms)
 
-    # Multi-value list fields
-    if filters.developers is not None:
-        query = apply_multi_value_filters(
-            query, game_models.Game.developers, filters.developers, game_models.Developer.name
-        )
-    if filters.publishers is not None:
-        query = apply_multi_value_filters(
-            query, game_models.Game.publishers, filters.publishers, game_models.Publisher.name
-        )
-    if filters.categories is not None:
-        query = apply_multi_value_filters(
-            query, game_models.Game.categories, filters.categories, game_models.Category.name
-        )
-    if filters.genres is not None:
-        query = apply_multi_value_filters(
-            query, game_models.Game.genres, filters.genres, game_models.Genre.name
-        )
-    if filters.tags is not None:
-        query = apply_multi_value_filters(
-            query, game_models.Game.tags, filters.tags, game_models.Tag.name
-        )
-    if filters.supported_languages is not None:
-        query = apply_multi_value_filters(
-            query, game_models.Game.languages, filters.supported_languages, game_models.Language.name
+    # Multi-value list fields: any of the values matches a dimension name, as a substring,
+    # exactly or as a prefix (case insensitive)
+    multi_value_filters = [
+        ('developers', filters.developers, game_models.Game.developers),
+        ('publishers', filters.publishers, game_models.Game.publishers),
+        ('categories', filters.categories, game_models.Game.categories),
+        ('genres', filters.genres, game_models.Game.genres),
+        ('tags', filters.tags, game_models.Game.tags),
+        ('languages', filters.supported_languages, game_models.Game.languages),
+    ]
+    postgresql = is_postgresql(db.bind)
+    projection_conditions = []
+    for key, values, relationship_field in multi_value_filters:
+        if values is None:
+            continue
+        model, association, column = DIMENSIONS[key]
+        if filters.match != 'contains':
+            dimension_ids = dimension_dictionary.lookup(db, key, values, filters.match)
+        elif postgresql:
+            dimension_ids = db.execute(matching_dimension_ids(values, model.name)).scalars().all()
+        else:
+            query = apply_multi_value_filters(query, relationship_field, values, model.name)
+            continue
+
+        # GIN lookups slow down with the number of ids, more ids use the reverse index of the association table
+        if postgresql and len(dimension_ids) <= settings.QUERY_PROJECTION_MAX_IDS:
+            ids_column = getattr(game_models.GameSearch, PROJECTION_COLUMNS[column])
+            projection_conditions.append(ids_column.overlap(dimension_ids))
+            continue
+        if filters.match == 'contains':
+            dimension_ids = matching_dimension_ids(values, model.name)
+        query = query.where(game_models.Game.id.in_(
+            select(association.c.game_id).where(association.c[column].in_(dimension_ids))
+        ))
+
+    if projection_conditions:
+        # One lookup in the game_search projection instead of an EXISTS per game and value
+        query = query.where(
+            game_models.Game.id.in_(select(game_models.GameSearch.game_id).where(*projection_conditions))
         )
 
-    # Total records for pagination
-    total_records = query.distinct().count()
-    total_pages = (total_records + pagination.page_size - 1) // pagination.page_size
+    return query
+
+
+def load_games(db: Session, game_ids: List[int], fields: Optional[List[str]] = None) -> List[game_models.Game]:
+    """
+    Load the games with the columns and relationships of the response fields, in the order of game_ids.
+
+    One query for the game rows and one IN (...) query per requested collection, instead of
+    joining every collection into a single cartesian row set. Columns of unrequested fields
+    are deferred and unrequested collections are not loaded.
+    """
+    if not game_ids:
+        return []
+    statement = select(game_models.Game).where(game_models.Game.id.in_(game_ids))
+    if fields is not None:
+        columns = [column for field in fields for column in SCALAR_FIELD_COLUMNS.get(field, [])]
+        statement = statement.options(load_only(*columns or [game_models.Game.id]))
+    statement = statement.options(*[
+        selectinload(relationship) for field, relationship in RELATIONSHIP_FIELDS.items()
+        if fields is None or field in fields
+    ])
+    games = {game.id: game for game in db.execute(statement).scalars()}
+    return [games[game_id] for game_id in game_ids if game_id in games]
+
 
-    # Pagination
-    offset = (pagination.page - 1) * pagination.page_size
-    games = (
+def response_fields(field_params: FieldParams) -> Optional[List[str]]:
+    """Requested response fields in GameResponse order, None when the whole game is requested."""
+    if field_params.fields is None and field_params.include is None:
+        return None
+    requested = set(field_params.fields or SCALAR_FIELD_COLUMNS) | set(field_params.include or [])
+    return [field for field in GAME_FIELDS if field in requested]
+
+
+def filters_key(filters: FilterParams) -> str:
+    # Filters selecting the same games share a key: unset fields are dropped, list values deduplicated and sorted
+    values = filters.model_dump(mode='json', exclude_none=True)
+    return json.dumps(
+        {field: sorted(set(value)) if isinstance(value, list) else value for field, value in values.items()},
+        sort_keys=True
+    )
+
+
+def query_key(filters: FilterParams, pagination: PaginationParams, fields: Optional[List[str]] = None) -> str:
+    # Key of one /api/query response, page is irrelevant to cursor requests
+    values = pagination.model_dump(mode='json', exclude={'page'} if pagination.cursor else None)
+    key = f"{filters_key(filters)}|{json.dumps(values, sort_keys=True)}"
+    return key if fields is None else f"{key}|{','.join(fields)}"
+
+
+def exact_count(db: Session, query: Select, filters: FilterParams) -> int:
+    key = (get_dataset_version(db), filters_key(filters))
+    total_records = count_cache.get(key)
+    if total_records is None:
+        total_records = db.execute(select(func.count()).select_from(query.subquery())).scalar_one()
+        count_cache.set(key, total_records)
+    return total_records
+
+
+def estimated_count(db: Session, query: Select) -> int:
+    """Row estimate of the PostgreSQL planner for the query, the query itself is not run."""
+    return int(explain_plan(db, query)['Plan']['Plan Rows'])
+
+
+def build_page_query(db: Session, query: Select, filters: FilterParams, pagination: PaginationParams) -> Select:
+    """The page of the filtered query: game ids and sort keys, plus one row to tell whether a next page exists."""
+    # Keyset pagination continues after the cursor position, offset pagination skips earlier pages
+    columns = sort_columns(db, filters, pagination)
+    descending = pagination.sort_order == 'desc'
+    offset = 0
+    if pagination.cursor is not None:
+        position = tuple_(*decode_position(pagination.cursor, pagination, columns))
+        query = query.where(tuple_(*columns) < position if descending else tuple_(*columns) > position)
+    else:
+        offset = (pagination.page - 1) * pagination.page_size
+
+    return (
         query
-        .options(
-            joinedload(game_models.Game.developers),
-            joinedload(game_models.Game.publishers),
-            joinedload(game_models.Game.categories),
-            joinedload(game_models.Game.genres),
-            joinedload(game_models.Game.tags),
-            joinedload(game_models.Game.languages)
-        )
-        .distinct()
+        .add_columns(*[column.label(f'sort_key_{number}') for number, column in enumerate(columns)])
+        .order_by(*[column.desc() if descending else column.asc() for column in columns])
         .offset(offset)
-        .limit(pagination.page_size)
-        .all()
+        .limit(pagination.page_size + 1)
+    )
+
+
+def game_to_dict(game: game_models.Game, fields: Optional[List[str]] = None) -> dict:
+    """A game in the shape of GameResponse, without building the model, restricted to fields when given."""
+    if fields is None:
+        return {field: value(game) for field, value in GAME_FIELDS.items()}
+    return {field: GAME_FIELDS[field](game) for field in fields}
+
+
+def get_filtered_games(
+    db: Session,
+    filters: FilterParams,
+    pagination: PaginationParams,
+    fields: Optional[List[str]] = None
+) -> GamePage:
+    query = build_filtered_query(db, filters)
+
+    # Total records for pagination, estimates fall back to exact counts where there is no planner estimate
+    total_records = None
+    total_records_estimated = False
+    if pagination.count == 'estimate' and is_postgresql(db.bind):
+        total_records = estimated_count(db, query)
+        total_records_estimated = True
+    elif pagination.count != 'none':
+        total_records = exact_count(db, query, filters)
+    total_pages = None
+    if total_records is not None:
+        total_pages = (total_records + pagination.page_size - 1) // pagination.page_size
+
+    # Phase one: the ordered page of ids with their sort keys, one extra row tells whether there is a next page
+    rows = db.execute(build_page_query(db, query, filters, pagination)).all()
+    has_next_page = len(rows) > pagination.page_size
+    rows = rows[:pagination.page_size]
+
+    # Phase two: the games of the page with the columns and relationships of the requested fields
+    games = load_games(db, [row[0] for row in rows], fields)
+
+    next_cursor = None
+    if has_next_page and rows:
+        next_cursor = encode_position(list(rows[-1][1:]), pagination)
+
+    return GamePage(
+        games=games,
+        total_records=total_records,
+        total_pages=total_pages,
+        total_records_estimated=total_records_estimated,
+        has_more=has_next_page,
+        next_cursor=next_cursor
     )
 
-    return games, total_records, total_pages
+
+async def get_filtered_games_async(
+    db: AsyncSession,
+    filters: FilterParams,
+    pagination: PaginationParams,
+    fields: Optional[List[str]] = None
+) -> GamePage:
+    """
+    get_filtered_games on an AsyncSession. The query building is shared, every query
+    is awaited on the async driver instead of blocking a threadpool thread.
+    """
+    return await db.run_sync(get_filtered_games, filters, pagination, fields)
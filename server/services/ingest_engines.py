@@ -0,0 +1,312 @@
+from io import StringIO
+from typing import Dict, List, Tuple
+import pandas as pd
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from server.config import settings
+from server.models.game_models import Game
+from server.services.dimension_service import DIMENSIONS, DimensionResolver
+from server.services.projection_service import refresh_game_search, refresh_games
+from server.utils.data_utils import GAME_COLUMNS, frame_to_records
+from server.utils.db_utils import dialect_insert, chunked, is_postgresql
+
+
+def batch_counts(
+        inserted: int = 0,
+        updated: int = 0,
+        unchanged: int = 0,
+        associations_added: int = 0
+) -> Dict[str, int]:
+    # Rows of a batch by outcome and the association rows added. Without incremental mode games that
+    # already exist keep their columns (only new associations are added) and are counted as unchanged.
+    return {'inserted': inserted, 'updated': updated, 'unchanged': unchanged, 'associations_added': associations_added}
+
+
+class SQLAlchemyIngestEngine:
+    """Bulk INSERT based engine, works on every supported database."""
+
+    name = 'sqlalchemy'
+
+    def __init__(self, db: Session, incremental: bool = False):
+        self.db = db
+        self.incremental = incremental
+        self.resolver = DimensionResolver(db)
+
+    def write_batch(self, frame: pd.DataFrame) -> Dict[str, int]:
+        if self.incremental:
+            return self._write_incremental(frame)
+
+        data_to_insert = frame_to_records(frame)
+        existing = self.load_games(data_to_insert)
+        game_ids = {app_id: game_id for app_id, (game_id, _) in existing.items()}
+        game_ids.update(self.insert_games(data_to_insert, existing))
+        # Like the game columns, the associations come from the first row of an app_id
+        first_rows = frame[~frame['app_id'].duplicated()]
+        associations_added = self.resolver.write_associations(
+            first_rows, [game_ids[app_id] for app_id in first_rows['app_id'].tolist()]
+        )
+        refresh_games(self.db, list(game_ids.values()))
+        inserted = len(game_ids) - len(existing)
+        return batch_counts(
+            inserted=inserted,
+            unchanged=len(data_to_insert) - inserted,
+            associations_added=associations_added,
+        )
+
+    def discard_batch(self):
+        # Called after the savepoint of a failed batch was rolled back
+        self.resolver.clear()
+
+    def _write_incremental(self, frame: pd.DataFrame) -> Dict[str, int]:
+        # Only the first row of an app_id in a batch is applied
+        duplicates = frame['app_id'].duplicated()
+        frame = frame[~duplicates]
+        data_to_insert = frame_to_records(frame)
+        existing = self.load_games(data_to_insert)
+
+        changed = [
+            data['app_id'] not in existing or existing[data['app_id']][1] != data['row_hash']
+            for data in data_to_insert
+        ]
+        to_upsert = [data for data, is_changed in zip(data_to_insert, changed) if is_changed]
+        inserted = sum(data['app_id'] not in existing for data in to_upsert)
+        counts = batch_counts(
+            inserted=inserted,
+            updated=len(to_upsert) - inserted,
+            unchanged=len(data_to_insert) - len(to_upsert) + int(duplicates.sum()),
+        )
+        if not to_upsert:
+            return counts
+
+        statement = dialect_insert(self.db.bind, Game.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['app_id'],
+            set_={column: statement.excluded[column] for column in [*GAME_COLUMNS[1:], 'row_hash']},
+        ).returning(Game.app_id, Game.id)
+        game_ids = dict(self.db.execute(statement, to_upsert).all())
+        self.resolver.write_associations(
+            frame[changed],
+            [game_ids[data['app_id']] for data in to_upsert],
+            replace=True,
+        )
+        refresh_games(self.db, list(game_ids.values()))
+        return counts
+
+    def load_games(self, data_to_insert: List[dict]) -> Dict[int, Tuple[int, str]]:
+        """Map app_id -> (games.id, row_hash) for the games of the batch that already exist."""
+        existing = {}
+        app_ids = list({data['app_id'] for data in data_to_insert})
+        for chunk in chunked(app_ids):
+            rows = self.db.execute(select(Game.app_id, Game.id, Game.row_hash).where(Game.app_id.in_(chunk)))
+            existing.update({app_id: (game_id, row_hash) for app_id, game_id, row_hash in rows})
+        return existing
+
+    def insert_games(self, data_to_insert: List[dict], existing: Dict[int, Tuple[int, str]]) -> Dict[int, int]:
+        """Create the games that do not exist yet, returns app_id -> games.id for them."""
+        new_games = {}
+        for data in data_to_insert:
+            # First occurrence wins when a file repeats an app_id
+            if data['app_id'] not in existing:
+                new_games.setdefault(data['app_id'], data)
+        if not new_games:
+            return {}
+
+        statement = (
+            dialect_insert(self.db.bind, Game.__table__)
+            .on_conflict_do_nothing(index_elements=['app_id'])
+            .returning(Game.app_id, Game.id)
+        )
+        game_ids = dict(self.db.execute(statement, list(new_games.values())).all())
+        # Games created concurrently by another ingest are not returned by DO NOTHING
+        missing = [app_id for app_id in new_games if app_id not in game_ids]
+        for chunk in chunked(missing):
+            rows = self.db.execute(select(Game.app_id, Game.id).where(Game.app_id.in_(chunk)))
+            game_ids.update(dict(rows.all()))
+        return game_ids
+
+
+STAGING_COLUMNS = [*GAME_COLUMNS, 'row_hash']
+
+CREATE_STAGING_TABLES = """
+CREATE TEMP TABLE IF NOT EXISTS staging_games (
+    row_index bigint,
+    app_id integer,
+    name text,
+    release_date date,
+    required_age smallint,
+    price numeric(10, 2),
+    dlc_count integer,
+    about_the_game text,
+    windows boolean,
+    mac boolean,
+    linux boolean,
+    positive integer,
+    negative integer,
+    score_rank integer,
+    row_hash text
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS staging_game_dimensions (
+    app_id integer,
+    dimension text,
+    name text
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS staging_changed_games (
+    app_id integer,
+    inserted boolean
+) ON COMMIT DELETE ROWS;
+TRUNCATE staging_games, staging_game_dimensions, staging_changed_games;
+"""
+
+# The first row of an app_id in a batch wins. Full mode leaves existing games untouched,
+# incremental mode updates the games whose row hash changed.
+MERGE_GAMES = f"""
+WITH merged AS (
+    INSERT INTO games ({', '.join(STAGING_COLUMNS)})
+    SELECT DISTINCT ON (app_id) {', '.join(STAGING_COLUMNS)}
+    FROM staging_games
+    ORDER BY app_id, row_index
+    {{on_conflict}}
+    RETURNING app_id, xmax = 0 AS inserted
+)
+INSERT INTO staging_changed_games SELECT app_id, inserted FROM merged
+"""
+
+ON_CONFLICT_KEEP = "ON CONFLICT (app_id) DO NOTHING"
+
+ON_CONFLICT_UPDATE = f"""
+    ON CONFLICT (app_id) DO UPDATE SET
+    {', '.join(f'{column} = EXCLUDED.{column}' for column in STAGING_COLUMNS[1:])}
+    WHERE games.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+"""
+
+# Associations are merged for every game of the batch in full mode, only for changed
+# games in incremental mode
+CHANGED_GAMES_FILTER = "AND s.app_id IN (SELECT app_id FROM staging_changed_games)"
+
+MERGE_DIMENSION = """
+INSERT INTO {table} (name)
+SELECT DISTINCT s.name FROM staging_game_dimensions s WHERE s.dimension = :dimension {changed_filter}
+ORDER BY s.name
+ON CONFLICT (name) DO NOTHING
+"""
+
+DELETE_REMOVED_ASSOCIATIONS = """
+DELETE FROM {association} a
+USING games g, staging_changed_games c
+WHERE a.game_id = g.id AND g.app_id = c.app_id AND NOT c.inserted
+AND NOT EXISTS (
+    SELECT 1 FROM staging_game_dimensions s
+    JOIN {table} d ON d.name = s.name
+    WHERE s.dimension = :dimension AND s.app_id = c.app_id AND d.id = a.{column}
+)
+"""
+
+MERGE_ASSOCIATION = """
+INSERT INTO {association} (game_id, {column})
+SELECT DISTINCT g.id, d.id
+FROM staging_game_dimensions s
+JOIN games g ON g.app_id = s.app_id
+JOIN {table} d ON d.name = s.name
+WHERE s.dimension = :dimension {changed_filter}
+ON CONFLICT DO NOTHING
+"""
+
+
+class PostgresCopyIngestEngine:
+    """
+    Streams each batch into session-local staging tables with COPY FROM STDIN and
+    merges them into games, the dimension tables and the association tables with
+    set based INSERT ... SELECT statements.
+    """
+
+    name = 'postgres_copy'
+
+    def __init__(self, db: Session, incremental: bool = False):
+        self.db = db
+        self.incremental = incremental
+
+    def write_batch(self, frame: pd.DataFrame) -> Dict[str, int]:
+        connection = self.db.connection()
+        connection.exec_driver_sql(CREATE_STAGING_TABLES)
+
+        games = frame[STAGING_COLUMNS].copy()
+        games.insert(0, 'row_index', frame.index)
+        games['release_date'] = frame['release_date'].map(lambda value: value.isoformat())
+        self._copy('staging_games', games, force_not_null=['name', 'about_the_game'])
+
+        # MERGE_GAMES keeps the first row of an app_id, only the names of that row are linked
+        first_rows = frame[~frame['app_id'].duplicated()]
+        dimensions = pd.concat(
+            [
+                first_rows[['app_id', key]].explode(key).dropna()
+                .rename(columns={key: 'name'}).assign(dimension=key)
+                for key in DIMENSIONS
+            ],
+            ignore_index=True,
+        )
+        self._copy('staging_game_dimensions', dimensions[['app_id', 'dimension', 'name']], force_not_null=['name'])
+        connection.exec_driver_sql('ANALYZE staging_games, staging_game_dimensions')
+
+        on_conflict = ON_CONFLICT_UPDATE if self.incremental else ON_CONFLICT_KEEP
+        self.db.execute(text(MERGE_GAMES.format(on_conflict=on_conflict)))
+        inserted, updated = self.db.execute(text(
+            "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM staging_changed_games"
+        )).one()
+
+        changed_filter = CHANGED_GAMES_FILTER if self.incremental else ''
+        associations_added = 0
+        for key, (model, association, column) in DIMENSIONS.items():
+            names = {
+                'table': model.__tablename__,
+                'association': association.name,
+                'column': column,
+                'changed_filter': changed_filter,
+            }
+            self.db.execute(text(MERGE_DIMENSION.format(**names)), {'dimension': key})
+            if self.incremental and updated:
+                self.db.execute(text(DELETE_REMOVED_ASSOCIATIONS.format(**names)), {'dimension': key})
+            associations_added += self.db.execute(text(MERGE_ASSOCIATION.format(**names)), {'dimension': key}).rowcount
+
+        changed_games = 'staging_changed_games' if self.incremental else 'staging_games'
+        refresh_game_search(self.db, f"g.app_id IN (SELECT app_id FROM {changed_games})")
+
+        return batch_counts(
+            inserted=inserted,
+            updated=updated,
+            unchanged=len(frame) - inserted - updated,
+            associations_added=associations_added,
+        )
+
+    def discard_batch(self):
+        # Nothing is kept between batches, the staging tables are truncated by the next one
+        pass
+
+    def _copy(self, table: str, frame: pd.DataFrame, force_not_null: List[str]):
+        buffer = StringIO()
+        frame.to_csv(buffer, header=False, index=False)
+        buffer.seek(0)
+        # Unquoted empty fields are NULL in CSV COPY, keep them as empty strings for text columns
+        statement = (
+            f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN "
+            f"WITH (FORMAT csv, FORCE_NOT_NULL ({', '.join(force_not_null)}))"
+        )
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        finally:
+            cursor.close()
+
+
+INGEST_ENGINES = {
+    SQLAlchemyIngestEngine.name: SQLAlchemyIngestEngine,
+    PostgresCopyIngestEngine.name: PostgresCopyIngestEngine,
+}
+
+
+def get_ingest_engine(db: Session, name: str = None, incremental: bool = False):
+    name = name or settings.INGEST_ENGINE
+    if name == 'auto':
+        name = PostgresCopyIngestEngine.name if is_postgresql(db.bind) else SQLAlchemyIngestEngine.name
+    if name not in INGEST_ENGINES:
+        raise ValueError(f"Unknown ingest engine: {name}")
+    return INGEST_ENGINES[name](db, incremental=incremental)
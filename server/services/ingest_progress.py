@@ -0,0 +1,71 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from server.config import settings
+
+
+class IngestProgress:
+    """
+    Progress counters of one ingest run.
+
+    Row counters are positions in the CSV file (invalid rows included), so a
+    resumed run continues from where the previous one stopped. The total row
+    count is estimated from the bytes parsed so far until the file is read.
+    """
+
+    def __init__(self, rows_written: int = 0):
+        self.stream = None
+        self.rows_downloaded = rows_written
+        self.rows_validated = rows_written
+        self.rows_written = rows_written
+        self._started_rows = rows_written
+        self._started = time.monotonic()
+        self._last_published = None
+
+    def downloaded(self, rows: int):
+        self.rows_downloaded = max(self.rows_downloaded, rows)
+
+    def validated(self, rows: int):
+        self.rows_validated = max(self.rows_validated, rows)
+
+    def written(self, rows: int):
+        self.rows_written = max(self.rows_written, rows)
+
+    def estimated_rows_total(self) -> Optional[int]:
+        if self.stream is None:
+            return None
+        if self.stream.exhausted:
+            return self.rows_downloaded
+        if not self.stream.bytes_total or not self.stream.bytes_read:
+            return None
+        return max(self.rows_downloaded, int(self.rows_downloaded * self.stream.bytes_total / self.stream.bytes_read))
+
+    def due(self) -> bool:
+        """Whether a snapshot should be published, at most one every INGEST_PROGRESS_SECONDS."""
+        return self._last_published is None or time.monotonic() - self._last_published >= settings.INGEST_PROGRESS_SECONDS
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._last_published = time.monotonic()
+        elapsed = self._last_published - self._started
+        rows_per_second = (self.rows_written - self._started_rows) / elapsed if elapsed > 0 else 0.0
+        rows_total = self.estimated_rows_total()
+
+        percent_done = None
+        eta_seconds = None
+        if rows_total:
+            percent_done = round(min(100.0, self.rows_written * 100 / rows_total), 1)
+            if rows_per_second > 0:
+                eta_seconds = round(max(0, rows_total - self.rows_written) / rows_per_second, 1)
+
+        return {
+            "rows_downloaded": self.rows_downloaded,
+            "rows_validated": self.rows_validated,
+            "rows_written": self.rows_written,
+            "rows_total_estimate": rows_total,
+            "bytes_received": self.stream.bytes_received if self.stream else 0,
+            "bytes_total": self.stream.bytes_total if self.stream else None,
+            "rows_per_second": round(rows_per_second, 1),
+            "percent_done": percent_done,
+            "eta_seconds": eta_seconds,
+            "updated_at": datetime.now().isoformat()
+        }
@@ -0,0 +1,282 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, case, or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from server.config import settings
+from server.constants.status import TaskStatus
+from server.db.session import SessionLocal, record_write
+from server.models.server_models import APIRequest
+from server.services.upload_service import process_csv_from_url, remove_spool
+
+# Woken when a job is queued by this process, other processes pick it up on their next poll
+job_available = asyncio.Event()
+workers: List[asyncio.Task] = []
+
+
+def notify_job_available():
+    job_available.set()
+
+
+def lease_expired(task: APIRequest) -> bool:
+    """True when the worker processing the task stopped renewing its lease."""
+    stale = datetime.now() - timedelta(seconds=settings.INGEST_JOB_LEASE_SECONDS)
+    return task.heartbeat_at is None or task.heartbeat_at < stale
+
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[str]:
+    """
+    Claim the oldest pending job, or a processing job whose lease expired.
+
+    Rows are locked with FOR UPDATE SKIP LOCKED, so concurrent workers never
+    claim the same job and do not wait on each other.
+    """
+    stale = datetime.now() - timedelta(seconds=settings.INGEST_JOB_LEASE_SECONDS)
+    while True:
+        task = (
+            db.query(APIRequest)
+            .filter(
+                APIRequest.file_url.isnot(None),
+                or_(
+                    APIRequest.status == TaskStatus.PENDING,
+                    and_(
+                        APIRequest.status == TaskStatus.PROCESSING,
+                        or_(APIRequest.heartbeat_at.is_(None), APIRequest.heartbeat_at < stale)
+                    )
+                )
+            )
+            .order_by(APIRequest.created_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if task is None:
+            db.commit()
+            return None
+
+        if task.attempts >= settings.INGEST_JOB_MAX_ATTEMPTS:
+            print(f"Task {task.id} was abandoned {task.attempts} times, marking it as failed")
+            task.status = TaskStatus.FAILED
+            task.error = f"Task was abandoned after {task.attempts} attempts"
+            task.worker_id = None
+            task.completed_at = datetime.now()
+            db.commit()
+            continue
+
+        # Compare and set on (status, attempts), databases without SKIP LOCKED (SQLite) can
+        # hand the same row to two workers and only one of them may win it
+        claimed = db.execute(
+            update(APIRequest)
+            .where(
+                APIRequest.id == task.id,
+                APIRequest.status == task.status,
+                APIRequest.attempts == task.attempts
+            )
+            .values(
+                status=TaskStatus.PROCESSING,
+                worker_id=worker_id,
+                heartbeat_at=datetime.now(),
+                attempts=task.attempts + 1
+            )
+        )
+        db.commit()
+        if claimed.rowcount:
+            return task.id
+
+
+def renew_lease(task_id: str, worker_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            update(APIRequest)
+            .where(APIRequest.id == task_id, APIRequest.worker_id == worker_id)
+            .values(heartbeat_at=datetime.now())
+        )
+        db.commit()
+        return result.rowcount > 0
+    finally:
+        db.close()
+
+
+def remove_stale_spools(db: Session):
+    """
+    Delete the local copies of uploads no task reads again: those of finished or unknown
+    tasks, and of tasks that failed more than INGEST_SPOOL_RETENTION_SECONDS ago.
+    """
+    if not os.path.isdir(settings.INGEST_SPOOL_DIR):
+        return
+    task_ids = {
+        name.split('.')[0] for name in os.listdir(settings.INGEST_SPOOL_DIR) if name.endswith(('.csv', '.csv.part'))
+    }
+    if not task_ids:
+        return
+    retained = datetime.now() - timedelta(seconds=settings.INGEST_SPOOL_RETENTION_SECONDS)
+    tasks = {task.id: task for task in db.query(APIRequest).filter(APIRequest.id.in_(task_ids))}
+    db.commit()
+    for task_id in task_ids:
+        task = tasks.get(task_id)
+        if task is not None and task.status in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+            continue
+        if task is not None and task.status == TaskStatus.FAILED and task.completed_at and task.completed_at >= retained:
+            continue
+        print(f"Removing the local copy of the upload of task {task_id}")
+        remove_spool(task_id)
+
+
+def sweep_spools():
+    db = SessionLocal()
+    try:
+        remove_stale_spools(db)
+    except (SQLAlchemyError, OSError) as e:
+        print(f"Could not remove stale upload copies: {e}")
+    finally:
+        db.close()
+
+
+def release_job(db: Session, task_id: str, worker_id: str):
+    # Hand an interrupted job back to the queue, it resumes from its checkpoint. Only
+    # while this worker still holds it, another worker may have claimed it since
+    db.rollback()
+    db.execute(
+        update(APIRequest)
+        .where(
+            APIRequest.id == task_id,
+            APIRequest.worker_id == worker_id,
+            APIRequest.status == TaskStatus.PROCESSING
+        )
+        .values(
+            status=TaskStatus.PENDING,
+            worker_id=None,
+            attempts=case((APIRequest.attempts > 0, APIRequest.attempts - 1), else_=0)
+        )
+    )
+    db.commit()
+
+
+async def process_csv_job(task_id: str, worker_id: str, lease_lost: Optional[asyncio.Event] = None):
+    db = SessionLocal()
+    try:
+        task = db.get(APIRequest, task_id)
+        if task is None:
+            return
+
+        try:
+            # Resumes from the task checkpoint when it has one
+            result = await process_csv_from_url(task.file_url, db, task=task, incremental=task.incremental)
+            rows_processed_successfully = result["rows_processed_successfully"]
+            rows_could_not_be_processed = result["rows_could_not_be_processed"]
+
+            if rows_processed_successfully == 0:
+                task_status = TaskStatus.FAILED
+                message = "CSV file could not be processed"
+            elif rows_could_not_be_processed > 0:
+                task_status = TaskStatus.PARTIALLY_COMPLETED
+                message = "Not all rows could be processed successfully"
+            else:
+                task_status = TaskStatus.COMPLETED
+                message = "CSV file processed successfully"
+
+            task.status = task_status
+            task.result = {
+                "message": message,
+                **result
+            }
+
+        except asyncio.CancelledError:
+            if lease_lost is not None and lease_lost.is_set():
+                # The task belongs to the worker that claimed it after the lease expired
+                db.rollback()
+            else:
+                print(f"Worker {worker_id} stopped, returning task {task_id} to the queue")
+                release_job(db, task_id, worker_id)
+            raise
+
+        except Exception as e:
+            db.rollback()
+            task.status = TaskStatus.FAILED
+            task.error = str(e)
+
+        task.worker_id = None
+        task.completed_at = datetime.now()
+        db.commit()
+        record_write()
+
+    finally:
+        db.close()
+
+
+async def run_job(task_id: str, worker_id: str):
+    loop = asyncio.get_running_loop()
+    lease_lost = asyncio.Event()
+    job = asyncio.create_task(process_csv_job(task_id, worker_id, lease_lost))
+    interval = settings.INGEST_JOB_LEASE_SECONDS / 3
+    try:
+        while not job.done():
+            await asyncio.wait({job}, timeout=interval)
+            if job.done():
+                break
+            try:
+                if not await loop.run_in_executor(None, renew_lease, task_id, worker_id):
+                    print(f"Worker {worker_id} lost the lease on task {task_id}, stopping it")
+                    lease_lost.set()
+                    job.cancel()
+                    break
+            except SQLAlchemyError as e:
+                print(f"Could not renew the lease on task {task_id}: {e}")
+        if lease_lost.is_set():
+            # Only the job was cancelled, the worker goes on with the next one
+            await asyncio.gather(job, return_exceptions=True)
+            return
+        await job
+    except asyncio.CancelledError:
+        job.cancel()
+        await asyncio.gather(job, return_exceptions=True)
+        raise
+
+
+async def worker_loop(worker_id: str):
+    loop = asyncio.get_running_loop()
+    print(f"Ingest worker {worker_id} started")
+    await loop.run_in_executor(None, sweep_spools)
+    while True:
+        db = SessionLocal()
+        try:
+            task_id = await loop.run_in_executor(None, claim_next_job, db, worker_id)
+        except SQLAlchemyError as e:
+            print(f"Ingest worker {worker_id} could not claim a job: {e}")
+            task_id = None
+        finally:
+            db.close()
+
+        if task_id is None:
+            try:
+                await asyncio.wait_for(job_available.wait(), timeout=settings.INGEST_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            job_available.clear()
+            continue
+
+        print(f"Ingest worker {worker_id} claimed task {task_id}")
+        try:
+            await run_job(task_id, worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ingest worker {worker_id} failed on task {task_id}: {e}")
+        await loop.run_in_executor(None, sweep_spools)
+
+
+def start_workers(concurrency: Optional[int] = None):
+    concurrency = settings.INGEST_JOB_WORKERS if concurrency is None else concurrency
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    for number in range(concurrency):
+        workers.append(asyncio.create_task(worker_loop(f"{prefix}:{number}")))
+
+
+async def stop_workers():
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    workers.clear()
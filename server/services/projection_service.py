@@ -0,0 +1,40 @@
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from server.services.dimension_service import DIMENSIONS
+from server.utils.db_utils import chunked, is_postgresql
+
+# Association column -> id array column of game_search, e.g. tag_id -> tag_ids
+PROJECTION_COLUMNS = {column: f'{column}s' for _, _, column in DIMENSIONS.values()}
+
+REFRESH_GAME_SEARCH = f"""
+INSERT INTO game_search (game_id, {', '.join(PROJECTION_COLUMNS.values())})
+SELECT g.id, {', '.join(
+    f'ARRAY(SELECT a.{column} FROM {association.name} a WHERE a.game_id = g.id)'
+    for _, association, column in DIMENSIONS.values()
+)}
+FROM games g
+WHERE {{games_filter}}
+ON CONFLICT (game_id) DO UPDATE SET
+{', '.join(f'{ids} = EXCLUDED.{ids}' for ids in PROJECTION_COLUMNS.values())}
+"""
+
+
+def refresh_game_search(db: Session, games_filter: str, params: dict = None):
+    """
+    Recompute the game_search rows of the games matching games_filter, a condition on
+    games aliased as g. Only PostgreSQL keeps the projection.
+    """
+    if not is_postgresql(db.bind):
+        return
+    db.execute(text(REFRESH_GAME_SEARCH.format(games_filter=games_filter)), params or {})
+
+
+def refresh_games(db: Session, game_ids: List[int]):
+    for chunk in chunked(game_ids):
+        refresh_game_search(db, "g.id = ANY(:game_ids)", {'game_ids': list(chunk)})
+
+
+def backfill_game_search(db: Session):
+    # Games written before the projection existed
+    refresh_game_search(db, "NOT EXISTS (SELECT 1 FROM game_search s WHERE s.game_id = g.id)")
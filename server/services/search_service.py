@@ -0,0 +1,58 @@
+import time
+from typing import Dict, Tuple
+from sqlalchemy import case, cast, func, inspect, literal_column, or_
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.engine import Engine
+from server.models import game_models
+from server.utils.db_utils import is_postgresql
+
+SEARCH_CONFIG = 'english'
+
+# While games.search_vector is missing it is looked up again at most this often, create_schema may add it any time
+SEARCH_VECTOR_RECHECK_SECONDS = 60
+
+# Stored in games.search_vector on PostgreSQL, matches in the name weigh more than matches in the description
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(about_the_game, '')), 'B')"
+)
+
+
+# Engine -> (whether games.search_vector exists, time.monotonic() of the lookup)
+search_vector_checks: Dict[Engine, Tuple[bool, float]] = {}
+
+
+def has_search_vector(engine: Engine) -> bool:
+    found, checked_at = search_vector_checks.get(engine, (False, None))
+    if not found and (checked_at is None or time.monotonic() - checked_at >= SEARCH_VECTOR_RECHECK_SECONDS):
+        found = any(column['name'] == 'search_vector' for column in inspect(engine).get_columns('games'))
+        search_vector_checks[engine] = (found, time.monotonic())
+    return found
+
+
+def search_vector(bind):
+    if has_search_vector(bind.engine):
+        return literal_column('games.search_vector')
+    # server/scripts/create_schema.py did not add the column yet, computed per row without the index
+    return literal_column(f"({SEARCH_VECTOR_SQL})")
+
+
+def search_query(search: str):
+    # Accepts what users type into search boxes: quoted phrases, or, -excluded words
+    return func.websearch_to_tsquery(SEARCH_CONFIG, search)
+
+
+def search_condition(bind, search: str):
+    """Games matching the search, full text search on PostgreSQL and substring matches elsewhere."""
+    if not is_postgresql(bind):
+        pattern = f'%{search}%'
+        return or_(game_models.Game.name.ilike(pattern), game_models.Game.about_the_game.ilike(pattern))
+    return search_vector(bind).op('@@')(search_query(search))
+
+
+def search_rank(bind, search: str):
+    """Relevance of a game for the search, higher is better."""
+    if not is_postgresql(bind):
+        return case((game_models.Game.name.ilike(f'%{search}%'), 1.0), else_=0.0)
+    # Double precision, so cursor positions compare exactly with the rank they were read from
+    return cast(func.ts_rank(search_vector(bind), search_query(search)), DOUBLE_PRECISION)
@@ -1,229 +1,205 @@
-import aiohttp
-import pandas as pd
+import asyncio
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from server.models.game_models import Game, Developer, Publisher, Category, Genre, Tag, Language
-from datetime import datetime
-from io import BytesIO
-from typing import Tuple, Dict, Any
-import ast
+from server.config import settings
+from server.models.server_models import APIRequest
+from server.services.cache_service import bump_dataset_version
+from server.services.csv_stream import CSVChunkStream, remove_spool_files
+from server.services.ingest_progress import IngestProgress
+from server.services.ingest_engines import get_ingest_engine
+from server.utils.data_utils import validate_games_frame
+from typing import Dict, Any, Optional
 
-def safe_int(value, default=None):
-    try:
-        return int(value)
-    except (ValueError, TypeError):
-        return default
 
-def safe_float(value, default=0.0):
+# Parsing, validation and database writes of every ingest run on these threads, so the
+# event loop keeps serving requests while an upload is in progress
+ingest_executor = ThreadPoolExecutor(max_workers=settings.INGEST_THREADS, thread_name_prefix='ingest')
+
+
+async def run_in_ingest_executor(func, *args):
+    future = asyncio.get_running_loop().run_in_executor(ingest_executor, func, *args)
     try:
-        return float(value)
-    except (ValueError, TypeError):
-        return default
-
-async def process_csv_from_url(file_url: str, db: Session) -> Tuple[int, int, Dict[Any, str]]:
-    errors = {}
-    data_to_insert = []
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(file_url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to download file: HTTP {response.status}")
-            content = await response.read()
-
-    # Read CSV into Pandas DataFrame
-    df = pd.read_csv(BytesIO(content), sep=',', dtype=str)
-    print(f"DataFrame shape: {df.shape}")
-    success_count = 0
-    failure_count = 0
-
-    # First Pass: Validate and prepare data
-    for index, row in df.iterrows():
-        print(f"Validating row {index}")
-        try:
-            # Parse and validate basic fields
-            app_id = safe_int(row['AppID'])
-            if app_id is None:
-                raise ValueError("AppID is missing or invalid")
-
-            name = row['Name']
-            if pd.isna(name):
-                raise ValueError("Name is missing")
-
-            release_date_str = row['Release date']
-            if pd.isna(release_date_str):
-                raise ValueError("Release date is missing")
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # The session must not be used by the caller before the thread let go of it
+        await asyncio.gather(future, return_exceptions=True)
+        raise
+
+
+def spool_path(task_id: str) -> str:
+    # Local copy of the file of an async upload, <path>.part while it is downloaded
+    return os.path.join(settings.INGEST_SPOOL_DIR, f"{task_id}.csv")
+
+
+def remove_spool(task_id: str):
+    remove_spool_files(spool_path(task_id))
+
+
+class BatchWriter:
+    """
+    Writes validated batches in file order and keeps the running counters.
+
+    Every batch is written inside its own savepoint and committed, so a failing
+    batch only loses its own rows. When a task is given its checkpoint is stored
+    with every commit and a resumed task continues after the last committed row.
+    """
+
+    def __init__(self, db: Session, task: Optional[APIRequest] = None, incremental: bool = False):
+        self.db = db
+        self.task = task
+        self.ingest_engine = get_ingest_engine(db, incremental=incremental)
+        self.errors = {}
+        self.success_count = 0
+        self.failure_count = 0
+        self.rows_committed = 0
+        self.counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        if task is not None:
+            checkpoint = task.result or {}
+            self.rows_committed = task.rows_committed or 0
+            self.success_count = checkpoint.get('rows_processed_successfully', 0)
+            self.failure_count = checkpoint.get('rows_could_not_be_processed', 0)
+            self.errors = dict(checkpoint.get('errors', {}))
+            for outcome in self.counts:
+                self.counts[outcome] = checkpoint.get(f'rows_{outcome}', 0)
+        self.progress = IngestProgress(self.rows_committed)
+
+    def add_errors(self, errors: Dict[str, str]):
+        # Capped, so the checkpoint written with every batch does not grow with the number of invalid rows
+        room = settings.INGEST_MAX_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.update(itertools.islice(errors.items(), room))
+
+    def write(self, first_row: int, last_row: int, frame, errors: Dict[str, str]):
+        self.add_errors(errors)
+        self.failure_count += len(errors)
+
+        if not frame.empty:
             try:
-                release_date = datetime.strptime(release_date_str, '%b %d, %Y').date()
-            except ValueError:
-                try:
-                    release_date = datetime.strptime(release_date_str, '%Y-%m-%d').date()
-                except ValueError:
-                    raise ValueError(f"Invalid date format for release date: {release_date_str}")
-
-            required_age = safe_int(row['Required age'], 0)
-            price = safe_float(row['Price'], 0.0)
-            dlc_count = safe_int(row['DLC count'], 0)
-            about_the_game = row['About the game'] if pd.notna(row['About the game']) else ''
-            windows = str(row['Windows']).strip().upper() == 'TRUE'
-            mac = str(row['Mac']).strip().upper() == 'TRUE'
-            linux = str(row['Linux']).strip().upper() == 'TRUE'
-            positive = safe_int(row['Positive'], 0)
-            negative = safe_int(row['Negative'], 0)
-            score_rank = safe_int(row['Score rank'], None)
-
-            # Prepare data for insertion
-            data_to_insert.append({
-                'app_id': app_id,
-                'name': name,
-                'release_date': release_date,
-                'required_age': required_age,
-                'price': price,
-                'dlc_count': dlc_count,
-                'about_the_game': about_the_game,
-                'windows': windows,
-                'mac': mac,
-                'linux': linux,
-                'positive': positive,
-                'negative': negative,
-                'score_rank': score_rank,
-                'row_data': row  # Keep original row for related entities
-            })
-
-        except Exception as e:
-            error_message = f"Error validating row {index}: {e}"
-            print(error_message)
-            errors[str(index)] = str(e)
-            continue
-
-    if errors:
-        failure_count = len(errors)
-        print(f"Validation failed for {failure_count} rows.")
-        if failure_count == len(data_to_insert):
-            return success_count, failure_count, errors
-
-
-    # Second Pass: Insert data into the database within a transaction
+                with self.db.begin_nested():
+                    counts = self.ingest_engine.write_batch(frame)
+                    # Cached query results stay valid when the batch only repeated stored data
+                    if counts['inserted'] or counts['updated'] or counts['associations_added']:
+                        bump_dataset_version(self.db)
+                self.success_count += len(frame)
+                for outcome in self.counts:
+                    self.counts[outcome] += counts[outcome]
+            except SQLAlchemyError as e:
+                print(f"An error occurred during database insertion: {e}")
+                self.ingest_engine.discard_batch()
+                self.failure_count += len(frame)
+                self.add_errors({f"database (rows {first_row}-{last_row})": str(e)})
+
+        self.rows_committed = last_row + 1
+        self.progress.written(self.rows_committed)
+        if self.task is not None:
+            self.task.rows_committed = self.rows_committed
+            self.task.result = self.result()
+            # Throttled, rides along with the checkpoint update of the task row
+            if self.progress.due():
+                self.task.progress = self.progress.snapshot()
+        self.db.commit()
+        print(f"Committed {self.rows_committed} rows ({self.success_count} written, {self.failure_count} failed)")
+
+    def publish_progress(self):
+        if self.task is not None:
+            self.task.progress = self.progress.snapshot()
+            self.db.commit()
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "rows_processed_successfully": self.success_count,
+            "rows_could_not_be_processed": self.failure_count,
+            **{f"rows_{outcome}": count for outcome, count in self.counts.items()},
+            "errors": self.errors
+        }
+
+
+def create_validation_pool() -> Optional[ProcessPoolExecutor]:
+    if settings.INGEST_WORKERS <= 1:
+        return None
+    # spawn: the parent runs an event loop and executor threads, which do not survive a fork
+    return ProcessPoolExecutor(
+        max_workers=settings.INGEST_WORKERS,
+        mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+async def process_csv_from_url(
+        file_url: str,
+        db: Session,
+        chunk_size: Optional[int] = None,
+        task: Optional[APIRequest] = None,
+        incremental: bool = False
+) -> Dict[str, Any]:
+    """
+    Ingest a CSV file and return the result counters and errors.
+
+    In incremental mode rows whose content hash matches the stored game are
+    skipped, changed games are upserted and their associations diffed.
+    """
+    loop = asyncio.get_running_loop()
+    writer = BatchWriter(db, task, incremental)
+    print(f"Writing rows with the {writer.ingest_engine.name} ingest engine")
+
+    task_spool_path = None
+    if task is not None:
+        task_spool_path = spool_path(task.id)
+        if writer.rows_committed:
+            print(f"Resuming task {task.id} after row {writer.rows_committed}")
+
+    # With a validation pool up to INGEST_WORKERS chunks are validated in parallel,
+    # results are still written (and committed) in file order
+    pool = create_validation_pool()
+    in_flight = settings.INGEST_WORKERS if pool else 1
+    pending = deque()
+
+    async def write_next():
+        first_row, last_row, validation = pending.popleft()
+        frame, errors = await validation
+        await run_in_ingest_executor(writer.write, first_row, last_row, frame, errors)
+
     try:
-        with db.begin():
-            for data in data_to_insert:
-                row = data['row_data']
-                # Check if game already exists
-                game = db.query(Game).filter(Game.app_id == data['app_id']).first()
-                if not game:
-                    game = Game(
-                        app_id=data['app_id'],
-                        name=data['name'],
-                        release_date=data['release_date'],
-                        required_age=data['required_age'],
-                        price=data['price'],
-                        dlc_count=data['dlc_count'],
-                        about_the_game=data['about_the_game'],
-                        windows=data['windows'],
-                        mac=data['mac'],
-                        linux=data['linux'],
-                        positive=data['positive'],
-                        negative=data['negative'],
-                        score_rank=data['score_rank']
-                    )
-                    db.add(game)
-                    db.flush()
-
-                # Process related entities
-                process_related_entities(row, game, db)
-                success_count += 1
-
-        print(f"Successfully processed {success_count} rows.")
-
-    except Exception as e:
-        db.rollback()
-        print(f"An error occurred during database insertion: {e}")
-        success_count = 0
-        failure_count = len(data_to_insert)
-        errors['database'] = str(e)
-
-    return success_count, failure_count, errors
-
-def process_related_entities(row, game, db):
-    # Developers
-    dev_names = row['Developers']
-    if pd.notna(dev_names) and dev_names.strip():
-        dev_names_list = [dev.strip() for dev in dev_names.split(',') if dev.strip()]
-        for dev_name in dev_names_list:
-            dev = db.query(Developer).filter(Developer.name == dev_name).first()
-            if not dev:
-                dev = Developer(name=dev_name)
-                db.add(dev)
-                db.flush()
-            if dev not in game.developers:
-                game.developers.append(dev)
-
-    # Publishers
-    pub_names = row['Publishers']
-    if pd.notna(pub_names) and pub_names.strip():
-        pub_names_list = [pub.strip() for pub in pub_names.split(',') if pub.strip()]
-        for pub_name in pub_names_list:
-            pub = db.query(Publisher).filter(Publisher.name == pub_name).first()
-            if not pub:
-                pub = Publisher(name=pub_name)
-                db.add(pub)
-                db.flush()
-            if pub not in game.publishers:
-                game.publishers.append(pub)
-
-    # Categories
-    categories_str = row['Categories']
-    if pd.notna(categories_str) and categories_str.strip():
-        categories_list = [cat.strip() for cat in categories_str.split(',') if cat.strip()]
-        for cat_name in categories_list:
-            cat = db.query(Category).filter(Category.name == cat_name).first()
-            if not cat:
-                cat = Category(name=cat_name)
-                db.add(cat)
-                db.flush()
-            if cat not in game.categories:
-                game.categories.append(cat)
-
-    # Genres
-    genres_str = row['Genres']
-    if pd.notna(genres_str) and genres_str.strip():
-        genres_list = [genre.strip() for genre in genres_str.split(',') if genre.strip()]
-        for genre_name in genres_list:
-            genre = db.query(Genre).filter(Genre.name == genre_name).first()
-            if not genre:
-                genre = Genre(name=genre_name)
-                db.add(genre)
-                db.flush()
-            if genre not in game.genres:
-                game.genres.append(genre)
-
-    # Tags
-    tags_str = row['Tags']
-    if pd.notna(tags_str) and tags_str.strip():
-        tags_list = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-        for tag_name in tags_list:
-            tag = db.query(Tag).filter(Tag.name == tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.add(tag)
-                db.flush()
-            if tag not in game.tags:
-                game.tags.append(tag)
-
-    # Languages
-    langs_str = row['Supported languages']
-    if pd.notna(langs_str) and langs_str.strip():
-        try:
-            supported_languages_list = ast.literal_eval(langs_str)
-            if not isinstance(supported_languages_list, list):
-                supported_languages_list = [str(supported_languages_list)]
-        except (ValueError, SyntaxError):
-            supported_languages_list = [langs_str.strip()]
-        for lang_name in supported_languages_list:
-            lang_name = lang_name.strip()
-            if lang_name:
-                lang = db.query(Language).filter(Language.name == lang_name).first()
-                if not lang:
-                    lang = Language(name=lang_name)
-                    db.add(lang)
-                    db.flush()
-                if lang not in game.languages:
-                    game.languages.append(lang)
+        # Download and parsing errors are raised to the caller, the checkpoint stays in place
+        stream = CSVChunkStream(
+            file_url,
+            chunk_size,
+            skip_rows=writer.rows_committed,
+            spool_path=task_spool_path,
+            executor=ingest_executor
+        )
+        async with stream as chunks:
+            writer.progress.stream = chunks
+            async for chunk in chunks:
+                writer.progress.downloaded(chunks.rows_read)
+
+                # First Pass: Validate and prepare data column by column
+                validation = loop.run_in_executor(pool or ingest_executor, validate_games_frame, chunk)
+                validation.add_done_callback(lambda _, rows=chunks.rows_read: writer.progress.validated(rows))
+                pending.append((int(chunk.index[0]), int(chunk.index[-1]), validation))
+
+                # Second Pass: Insert the valid rows of the oldest batch
+                if len(pending) >= in_flight:
+                    await write_next()
+
+            while pending:
+                await write_next()
+
+            chunks.remove_spool()
+            await run_in_ingest_executor(writer.publish_progress)
+    finally:
+        for _, _, validation in pending:
+            validation.cancel()
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    if writer.errors:
+        print(f"{writer.failure_count} rows could not be processed.")
+    print(f"Successfully processed {writer.success_count} rows ({writer.counts}).")
+
+    return writer.result()
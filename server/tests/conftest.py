@@ -0,0 +1,45 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+# server.config requires DATABASE_URL, tests run on a throwaway SQLite file unless one is given
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='watcher-tests-'), 'test.db'))
+os.environ.setdefault('INGEST_JOB_WORKERS', '0')
+
+from server.db.base import Base  # noqa: E402
+import server.models  # noqa: E402,F401 (registers every table on Base.metadata)
+import server.models.server_models  # noqa: E402,F401
+from server.config import settings  # noqa: E402
+from server.scripts.create_schema import create_tables  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture(scope='module')
+def pg_engine(request):
+    """Engine on a PostgreSQL schema named after the test module, with the tables created. Dropped afterwards."""
+    if make_url(settings.DATABASE_URL).get_backend_name() != 'postgresql':
+        pytest.skip("needs DATABASE_URL to be a PostgreSQL database")
+    schema = request.module.__name__.rsplit('.', 1)[-1]
+    # Only the test schema is on the search path, so create_all does not find the tables of public
+    engine = create_engine(settings.DATABASE_URL, connect_args={'options': f'-csearch_path={schema}'})
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        connection.exec_driver_sql(f"CREATE SCHEMA {schema}")
+    try:
+        create_tables(engine)
+        yield engine
+    finally:
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        engine.dispose()
@@ -0,0 +1,23 @@
+import pandas as pd
+from sqlalchemy import select
+from server.models.game_models import Game, Tag
+from server.models.relationship_models import game_tags
+from server.utils.data_utils import CSV_COLUMNS
+
+
+def csv_frame(rows, first_row: int = 0) -> pd.DataFrame:
+    """Raw chunk as CSVChunkStream yields it: string columns, missing values as NaN, indexed by row number."""
+    return pd.DataFrame(rows, columns=CSV_COLUMNS, index=range(first_row, first_row + len(rows))).astype(object)
+
+
+def game_row(app_id, **values) -> dict:
+    return {'AppID': str(app_id), 'Name': f"Game {app_id}", 'Release date': 'Jan 1, 2020', 'Price': '9.99', **values}
+
+
+def tag_names(db, app_id):
+    return db.execute(
+        select(Tag.name)
+        .join(game_tags, game_tags.c.tag_id == Tag.id)
+        .join(Game, Game.id == game_tags.c.game_id)
+        .where(Game.app_id == app_id)
+    ).scalars().all()
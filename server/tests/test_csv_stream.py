@@ -0,0 +1,63 @@
+import asyncio
+from aiohttp import web
+from server.services.csv_stream import CSVChunkStream
+from server.tests.helpers import csv_frame, game_row
+
+
+async def read_rows(file_url: str, spool_path: str):
+    rows = []
+    async with CSVChunkStream(file_url, chunk_size=100, spool_path=spool_path) as chunks:
+        async for chunk in chunks:
+            rows.extend(chunk['AppID'].tolist())
+    return rows
+
+
+async def serve_and_read(tmp_path, body: bytes, spooled: bytes, ranges: bool):
+    """Reads body over HTTP with spooled as the .part file of an interrupted download."""
+    (tmp_path / 'games.csv').write_bytes(body)
+    spool_path = str(tmp_path / 'spool' / 'task.csv')
+    (tmp_path / 'spool').mkdir()
+    (tmp_path / 'spool' / 'task.csv.part').write_bytes(spooled)
+    requested_ranges = []
+
+    async def handler(request):
+        requested_ranges.append(request.headers.get('Range'))
+        if ranges:
+            return web.FileResponse(tmp_path / 'games.csv')
+        return web.Response(body=body, content_type='text/csv')
+
+    app = web.Application()
+    app.router.add_get('/games.csv', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    try:
+        port = site._server.sockets[0].getsockname()[1]
+        rows = await read_rows(f"http://127.0.0.1:{port}/games.csv", spool_path)
+    finally:
+        await runner.cleanup()
+    with open(spool_path, 'rb') as spool:
+        return rows, requested_ranges, spool.read()
+
+
+def games_csv(count: int) -> bytes:
+    return csv_frame([game_row(app_id) for app_id in range(count)]).to_csv(index=False).encode()
+
+
+def test_interrupted_download_continues_after_spooled_bytes(tmp_path):
+    body = games_csv(1000)
+    rows, requested_ranges, spool = asyncio.run(serve_and_read(tmp_path, body, body[:12345], ranges=True))
+
+    assert requested_ranges == ['bytes=12345-']
+    assert rows == [str(app_id) for app_id in range(1000)]
+    assert spool == body
+
+
+def test_download_starts_over_without_range_support(tmp_path):
+    body = games_csv(1000)
+    rows, requested_ranges, spool = asyncio.run(serve_and_read(tmp_path, body, body[:12345], ranges=False))
+
+    assert requested_ranges == ['bytes=12345-']
+    assert rows == [str(app_id) for app_id in range(1000)]
+    assert spool == body
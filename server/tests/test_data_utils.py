@@ -0,0 +1,143 @@
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from server.tests.helpers import csv_frame, game_row
+from server.utils.data_utils import GAME_COLUMNS, frame_to_records, validate_games_frame
+
+
+def safe_int(value, default=None):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def safe_float(value, default=0.0):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def validate_row(row) -> dict:
+    """Per-row validation of process_csv_from_url before it was vectorized, kept as the reference."""
+    app_id = safe_int(row['AppID'])
+    if app_id is None:
+        raise ValueError("AppID is missing or invalid")
+
+    name = row['Name']
+    if pd.isna(name):
+        raise ValueError("Name is missing")
+
+    release_date_str = row['Release date']
+    if pd.isna(release_date_str):
+        raise ValueError("Release date is missing")
+    try:
+        release_date = datetime.strptime(release_date_str, '%b %d, %Y').date()
+    except ValueError:
+        try:
+            release_date = datetime.strptime(release_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"Invalid date format for release date: {release_date_str}")
+
+    return {
+        'app_id': app_id,
+        'name': name,
+        'release_date': release_date,
+        'required_age': safe_int(row['Required age'], 0),
+        'price': safe_float(row['Price'], 0.0),
+        'dlc_count': safe_int(row['DLC count'], 0),
+        'about_the_game': row['About the game'] if pd.notna(row['About the game']) else '',
+        'windows': str(row['Windows']).strip().upper() == 'TRUE',
+        'mac': str(row['Mac']).strip().upper() == 'TRUE',
+        'linux': str(row['Linux']).strip().upper() == 'TRUE',
+        'positive': safe_int(row['Positive'], 0),
+        'negative': safe_int(row['Negative'], 0),
+        'score_rank': safe_int(row['Score rank'], None),
+    }
+
+
+def validate_rows(df: pd.DataFrame):
+    valid, errors = {}, {}
+    for index, row in df.iterrows():
+        try:
+            valid[index] = validate_row(row)
+        except Exception as e:
+            errors[str(index)] = str(e)
+    return valid, errors
+
+
+def same_value(actual, expected) -> bool:
+    if isinstance(expected, float) and math.isnan(expected):
+        return isinstance(actual, float) and math.isnan(actual)
+    return actual == expected and type(actual) is type(expected)
+
+
+EDGE_CASE_ROWS = [
+    game_row(1),
+    game_row(2, **{'Release date': 'Jan 1, 1600'}),
+    game_row(3, **{'Release date': 'Dec 31, 2999'}),
+    game_row(4, **{'Release date': '2021-3-7'}),
+    game_row(5, **{'Release date': '31/12/2020'}),
+    game_row(6, **{'Release date': np.nan}),
+    game_row(7, Name=np.nan),
+    game_row('1_000', **{'Required age': '1_8', 'Positive': ' 12 ', 'Negative': '+3', 'DLC count': '-1'}),
+    game_row(' 9 ', **{'Score rank': '07', 'Required age': '18.0', 'Positive': 'abc', 'Negative': ''}),
+    game_row('10.0'),
+    game_row(np.nan),
+    game_row(11, Price=np.nan),
+    game_row(12, Price='free'),
+    game_row(13, Price=' 1_000.5 ', **{'DLC count': '١٢'}),
+    game_row(14, Price='1e3', **{'Score rank': np.nan}),
+    game_row(15, Price='', Windows=' true ', Mac='False', Linux=np.nan, **{'About the game': np.nan}),
+    game_row(16, **{'Score rank': '99999999999999999999', 'Positive': '123456789012345678901'}),
+]
+
+
+def test_validation_matches_the_per_row_implementation():
+    df = csv_frame(EDGE_CASE_ROWS)
+    expected_rows, expected_errors = validate_rows(df)
+
+    frame, errors = validate_games_frame(df)
+
+    # Deliberate changes: a missing price is 0 as games.price is NOT NULL
+    for index, expected in expected_rows.items():
+        if pd.isna(df.at[index, 'Price']):
+            expected['price'] = 0.0
+    assert errors == expected_errors
+    assert list(frame.index) == list(expected_rows)
+    for index, expected in expected_rows.items():
+        for column in GAME_COLUMNS:
+            actual = frame.at[index, column]
+            if isinstance(actual, (np.integer, np.floating, np.bool_)):
+                actual = actual.item()
+            assert same_value(actual, expected[column]), (index, column, actual, expected[column])
+
+
+def test_records_keep_missing_values_insertable():
+    frame, errors = validate_games_frame(csv_frame([game_row(1, Price=np.nan, **{'Release date': 'Jan 1, 1600'})]))
+
+    record, = frame_to_records(frame)
+    assert record['price'] == 0.0
+    assert record['score_rank'] is None
+    assert record['release_date'].year == 1600
+
+
+@pytest.mark.parametrize('app_id', ['99999999999999999999', '2147483648', '-2147483649'])
+def test_app_ids_outside_the_column_range_are_invalid(app_id):
+    frame, errors = validate_games_frame(csv_frame([game_row(app_id), game_row(2147483647)]))
+
+    assert errors == {'0': 'AppID is missing or invalid'}
+    assert list(frame['app_id']) == [2147483647]
+
+
+@pytest.mark.parametrize('value', ['Feb 30, 2020', '2020-13-01', 'yesterday'])
+def test_invalid_dates_are_reported(value):
+    frame, errors = validate_games_frame(csv_frame([game_row(1, **{'Release date': value})]))
+
+    assert frame.empty
+    assert errors == {'0': f"Invalid date format for release date: {value}"}
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from server.models.game_models import Game
+from server.services.ingest_engines import PostgresCopyIngestEngine, SQLAlchemyIngestEngine
+from server.tests.helpers import csv_frame, game_row, tag_names
+from server.utils.data_utils import validate_games_frame
+
+
+@pytest.fixture
+def pg_db(pg_engine):
+    # Never committed, the rollback leaves the schema empty for the next test
+    with Session(pg_engine) as db:
+        yield db
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+@pytest.mark.parametrize('engine_class, db_fixture', [
+    (SQLAlchemyIngestEngine, 'db'),
+    (SQLAlchemyIngestEngine, 'pg_db'),
+    (PostgresCopyIngestEngine, 'pg_db'),
+], ids=['sqlalchemy-sqlite', 'sqlalchemy-postgresql', 'postgres_copy'])
+def test_first_row_of_an_app_id_wins(request, engine_class, db_fixture, incremental):
+    db = request.getfixturevalue(db_fixture)
+    frame, errors = validate_games_frame(csv_frame([
+        game_row(1, Name='First', Tags='FirstTag'),
+        game_row(1, Name='Second', Tags='SecondTag'),
+    ]))
+
+    counts = engine_class(db, incremental=incremental).write_batch(frame)
+
+    assert counts['inserted'] == 1
+    assert db.execute(select(Game.name).where(Game.app_id == 1)).scalar_one() == 'First'
+    assert tag_names(db, 1) == ['FirstTag']
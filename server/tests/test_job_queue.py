@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from server.config import settings
+from server.constants.status import TaskStatus
+from server.models.server_models import APIRequest
+from server.services import job_queue
+
+WORKER_ID = 'host:1:0'
+OTHER_WORKER_ID = 'host:2:0'
+
+
+@pytest.fixture
+def task(db, monkeypatch):
+    monkeypatch.setattr(job_queue, 'SessionLocal', sessionmaker(bind=db.bind))
+    monkeypatch.setattr(settings, 'INGEST_JOB_LEASE_SECONDS', 0.3)
+
+    async def process_forever(file_url, db, task=None, incremental=False):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(job_queue, 'process_csv_from_url', process_forever)
+    task = APIRequest(
+        id='task-1', file_url='http://localhost/games.csv', status=TaskStatus.PROCESSING,
+        worker_id=WORKER_ID, heartbeat_at=datetime.now(), attempts=1,
+    )
+    db.add(task)
+    db.commit()
+    return task
+
+
+def test_lost_lease_stops_only_the_job(db, task, monkeypatch):
+    def renew_lease(task_id, worker_id):
+        # Another worker claimed the task after the lease expired
+        with job_queue.SessionLocal() as other:
+            other.execute(
+                update(APIRequest).where(APIRequest.id == task_id)
+                .values(worker_id=OTHER_WORKER_ID, attempts=APIRequest.attempts + 1)
+            )
+            other.commit()
+        return False
+
+    monkeypatch.setattr(job_queue, 'renew_lease', renew_lease)
+
+    asyncio.run(asyncio.wait_for(job_queue.run_job(task.id, WORKER_ID), timeout=5))
+
+    db.refresh(task)
+    assert (task.status, task.worker_id, task.attempts) == (TaskStatus.PROCESSING, OTHER_WORKER_ID, 2)
+
+
+def test_stopped_worker_returns_its_job(db, task, monkeypatch):
+    monkeypatch.setattr(job_queue, 'renew_lease', lambda task_id, worker_id: True)
+
+    async def stop_worker():
+        worker = asyncio.create_task(job_queue.run_job(task.id, WORKER_ID))
+        await asyncio.sleep(0.5)
+        worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await worker
+
+    asyncio.run(stop_worker())
+
+    db.refresh(task)
+    assert (task.status, task.worker_id, task.attempts) == (TaskStatus.PENDING, None, 0)
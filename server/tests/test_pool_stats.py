@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from server.config import settings
+from server.db.pool_stats import listen_pool_events, pool_options, pool_status
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'DB_POOL_SIZE', 1)
+    monkeypatch.setattr(settings, 'DB_MAX_OVERFLOW', 0)
+    monkeypatch.setattr(settings, 'DB_POOL_TIMEOUT', 0.1)
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **pool_options(url))
+    listen_pool_events(engine.pool)
+    yield engine
+    engine.dispose()
+
+
+def test_uncontended_checkouts_do_not_wait(engine):
+    for _ in range(3):
+        with engine.connect():
+            pass
+
+    status = pool_status(engine.pool)
+    assert status['checkouts'] == 3
+    assert status['waiting'] == 0
+    assert status['peak_waiting'] == 0
+    assert status['checkout_latency_ms']['max'] is not None
+
+
+def test_checkouts_of_an_exhausted_pool_wait(engine):
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    status = pool_status(engine.pool)
+    assert status['waiting'] == 0
+    assert status['peak_waiting'] == 1
+    assert status['timeouts'] == 1
@@ -0,0 +1,125 @@
+# /api/query must keep answering while an upload is ingested: parsing, validation and writes run on the
+# ingest threads, not on the event loop serving the queries. The ingest is held inside its first batch write
+# and every other ingest thread is occupied, then queries must still be served.
+import asyncio
+import threading
+import httpx
+from aiohttp import web
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from server.api import query
+from server.config import settings
+from server.db.base import Base
+from server.db.session import create_engines, get_async_db, get_async_read_db
+from server.main import app
+from server.scripts.synthetic_data import generate_games_csv_frame
+from server.services import game_service, job_queue, upload_service
+from server.services.cache_service import NullCache
+from server.services.upload_service import BatchWriter
+from server.utils.data_utils import validate_games_frame
+
+STORED_ROWS = 200
+UPLOAD_ROWS = 2000
+QUERIES = 20
+# Upper bound of every wait, the test fails instead of hanging when the ingest is not isolated
+TIMEOUT_SECONDS = 30
+QUERY = '/api/query?page_size=20&count=exact'
+
+
+async def serve_file(path):
+    async def send_file(request):
+        return web.FileResponse(path)
+
+    app = web.Application()
+    app.router.add_get('/games.csv', send_file)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/games.csv"
+
+
+async def query_during_blocked_ingest(file_url, async_engine, write_started, release):
+    loop = asyncio.get_running_loop()
+    job_queue.start_workers(1)
+    blockers = []
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.post('/api/upload_data_async', json={'file_url': file_url})
+            task_id = response.json()['task_id']
+            assert await loop.run_in_executor(None, write_started.wait, TIMEOUT_SECONDS)
+            # The remaining ingest threads are busy too
+            blockers = [
+                upload_service.ingest_executor.submit(release.wait, TIMEOUT_SECONDS)
+                for _ in range(settings.INGEST_THREADS)
+            ]
+
+            responses = await asyncio.wait_for(
+                asyncio.gather(*(client.get(QUERY) for _ in range(QUERIES))), TIMEOUT_SECONDS
+            )
+            status = (await client.get('/api/upload_data_async/status/', params={'task_id': task_id})).json()
+            assert status['status'] == 'processing'
+
+            release.set()
+            while status['status'] in ('pending', 'processing'):
+                await asyncio.sleep(0.1)
+                status = (await client.get('/api/upload_data_async/status/', params={'task_id': task_id})).json()
+        return responses, status
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.result()
+        await job_queue.stop_workers()
+        await async_engine.dispose()
+
+
+def test_queries_are_served_while_ingest_threads_are_busy(tmp_path, monkeypatch):
+    sync_engine, async_engine = create_engines(f"sqlite:///{tmp_path / 'latency.db'}")
+    Base.metadata.create_all(sync_engine)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_test_db():
+        async with AsyncSession() as db:
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, get_test_db)
+    monkeypatch.setitem(app.dependency_overrides, get_async_read_db, get_test_db)
+    monkeypatch.setattr(job_queue, 'SessionLocal', sessionmaker(bind=sync_engine))
+    monkeypatch.setattr(settings, 'INGEST_SPOOL_DIR', str(tmp_path / 'spool'))
+    # Every request reaches the database, they would otherwise be cache hits
+    monkeypatch.setattr(query, 'response_cache', NullCache())
+    monkeypatch.setattr(game_service, 'count_cache', NullCache())
+
+    with sessionmaker(bind=sync_engine)() as db:
+        frame, errors = validate_games_frame(generate_games_csv_frame(STORED_ROWS))
+        BatchWriter(db).write(0, STORED_ROWS - 1, frame, errors)
+
+    write_started = threading.Event()
+    release = threading.Event()
+    write = BatchWriter.write
+
+    def blocking_write(self, *args):
+        write_started.set()
+        release.wait(TIMEOUT_SECONDS)
+        return write(self, *args)
+
+    monkeypatch.setattr(BatchWriter, 'write', blocking_write)
+    file_path = tmp_path / 'games.csv'
+    generate_games_csv_frame(UPLOAD_ROWS, seed=1, start_app_id=100000).to_csv(file_path, index=False)
+
+    async def run():
+        runner, file_url = await serve_file(file_path)
+        try:
+            return await query_during_blocked_ingest(file_url, async_engine, write_started, release)
+        finally:
+            await runner.cleanup()
+
+    try:
+        responses, status = asyncio.run(run())
+    finally:
+        sync_engine.dispose()
+
+    assert [response.status_code for response in responses] == [200] * QUERIES
+    assert all(response.json()['total_records'] == STORED_ROWS for response in responses)
+    assert status['status'] == 'completed'
+    assert status['result']['rows_processed_successfully'] == UPLOAD_ROWS
@@ -0,0 +1,121 @@
+# Fails when a representative /api/query filter shape regresses to a sequential scan of games, game_search
+# or an association table. Needs PostgreSQL, e.g. DATABASE_URL=postgresql://localhost/watcher_test pytest.
+# The synthetic dataset is loaded into a schema of its own, which is dropped afterwards.
+import asyncio
+from datetime import date
+from typing import Iterator, List
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from server.config import settings
+from server.db.session import async_database_url
+from server.models.pydantic_models import FilterParams, PaginationParams
+from server.scripts.create_schema import add_search_indexes
+from server.scripts.synthetic_data import generate_games_csv_frame
+from server.services.dimension_service import DIMENSIONS
+from server.services.game_service import build_filtered_query, build_page_query, get_filtered_games_async
+from server.services.upload_service import BatchWriter
+from server.utils.data_utils import validate_games_frame
+from server.utils.db_utils import explain_plan
+
+pytestmark = pytest.mark.skipif(
+    make_url(settings.DATABASE_URL).get_backend_name() != 'postgresql',
+    reason="query plans are only checked on PostgreSQL",
+)
+
+SYNTHETIC_ROWS = 40000
+
+CHECKED_TABLES = {'games', 'game_search', *(association.name for _, association, _ in DIMENSIONS.values())}
+
+# (name, filters, pagination, whether the count query is checked too). Filters matching most of the
+# synthetic games are left out, a sequential scan is the right plan for them.
+QUERY_SHAPES = [
+    ('app_id', FilterParams(app_id=1003), PaginationParams(), True),
+    ('release date range', FilterParams(release_date_min=date(2024, 6, 1)), PaginationParams(), True),
+    ('release date between', FilterParams(release_date_min=date(2010, 3, 1), release_date_max=date(2010, 3, 31)),
+     PaginationParams(sort_by='release_date'), True),
+    ('positive reviews', FilterParams(positive_reviews_min=99000), PaginationParams(), True),
+    ('negative reviews', FilterParams(negative_reviews_max=50), PaginationParams(), True),
+    ('score rank', FilterParams(score_rank=50), PaginationParams(), True),
+    ('required age and dlc', FilterParams(required_age=18, dlc_count=10), PaginationParams(), True),
+    ('linux', FilterParams(platforms=['linux']), PaginationParams(), False),
+    ('developer exact', FilterParams(developers=['Developer 17'], match='exact'), PaginationParams(), True),
+    ('developer prefix', FilterParams(developers=['Developer 17'], match='prefix'), PaginationParams(), True),
+    ('publisher contains', FilterParams(publishers=['Publisher 123']), PaginationParams(), True),
+    ('search', FilterParams(search='"Synthetic Game 12345"'), PaginationParams(), True),
+    ('sorted by name', FilterParams(), PaginationParams(sort_by='name'), False),
+    ('sorted by price', FilterParams(), PaginationParams(sort_by='price', sort_order='desc'), False),
+    ('deep page', FilterParams(), PaginationParams(page=300, page_size=100), False),
+]
+
+
+def plan_nodes(node: dict) -> Iterator[dict]:
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def sequential_scans(plan: dict) -> List[str]:
+    return [
+        node['Relation Name'] for node in plan_nodes(plan['Plan'])
+        if node['Node Type'] == 'Seq Scan' and node['Relation Name'] in CHECKED_TABLES
+    ]
+
+
+@pytest.fixture(scope='module')
+def plan_db(pg_engine):
+    add_search_indexes(pg_engine)
+    with Session(pg_engine) as db:
+        # Ingested like an upload, so game_search and the dimension tables are filled the same way
+        writer = BatchWriter(db)
+        raw = generate_games_csv_frame(SYNTHETIC_ROWS)
+        for start in range(0, len(raw), settings.INGEST_CHUNK_SIZE):
+            chunk = raw.iloc[start:start + settings.INGEST_CHUNK_SIZE]
+            frame, errors = validate_games_frame(chunk)
+            writer.write(int(chunk.index[0]), int(chunk.index[-1]), frame, errors)
+        assert writer.success_count == SYNTHETIC_ROWS
+        # Current statistics, plans of a freshly loaded table are not representative
+        db.execute(text(f"ANALYZE {', '.join(sorted(CHECKED_TABLES))}"))
+        db.commit()
+        yield db
+
+
+@pytest.mark.parametrize(
+    'filters, pagination, check_count',
+    [shape[1:] for shape in QUERY_SHAPES],
+    ids=[shape[0] for shape in QUERY_SHAPES],
+)
+def test_query_shape_uses_indexes(plan_db, filters, pagination, check_count):
+    query = build_filtered_query(plan_db, filters)
+    statements = {'page': build_page_query(plan_db, query, filters, pagination)}
+    if check_count:
+        statements['count'] = select(func.count()).select_from(query.subquery())
+    scans = {kind: sequential_scans(explain_plan(plan_db, statement)) for kind, statement in statements.items()}
+    assert scans == {kind: [] for kind in statements}
+
+
+async def estimated_total(filters: FilterParams, schema: str) -> int:
+    # /api/query runs on the async driver, asyncpg takes positional parameters
+    engine = create_async_engine(
+        async_database_url(settings.DATABASE_URL), connect_args={'server_settings': {'search_path': schema}}
+    )
+    try:
+        async with AsyncSession(engine) as db:
+            page = await get_filtered_games_async(db, filters, PaginationParams(count='estimate'))
+        assert page.total_records_estimated
+        return page.total_records
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize('filters', [
+    FilterParams(),
+    FilterParams(app_id=1003),
+    FilterParams(release_date_min=date(2010, 3, 1), release_date_max=date(2010, 3, 31), developers=['Developer 17']),
+], ids=['no filter', 'app_id', 'dates and developer'])
+def test_estimated_count_on_the_async_driver(plan_db, filters):
+    expected = int(explain_plan(plan_db, build_filtered_query(plan_db, filters))['Plan']['Plan Rows'])
+    schema = plan_db.execute(text('SELECT current_schema()')).scalar()
+    assert asyncio.run(estimated_total(filters, schema)) == expected
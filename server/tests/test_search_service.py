@@ -0,0 +1,15 @@
+from server.services import search_service
+
+
+def test_search_vector_column_is_found_once_added(db, monkeypatch):
+    monkeypatch.setattr(search_service, 'search_vector_checks', {})
+    engine = db.bind
+    assert not search_service.has_search_vector(engine)
+
+    # Added by create_schema while the server runs
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ALTER TABLE games ADD COLUMN search_vector TEXT")
+    assert not search_service.has_search_vector(engine)
+
+    monkeypatch.setattr(search_service, 'SEARCH_VECTOR_RECHECK_SECONDS', 0)
+    assert search_service.has_search_vector(engine)
@@ -0,0 +1,79 @@
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from server.config import settings
+from server.db import session
+from server.models.game_models import Game
+from server.services.cache_service import get_dataset_version
+from server.services.upload_service import BatchWriter
+from server.tests.helpers import csv_frame, game_row, tag_names
+from server.utils.data_utils import validate_games_frame
+
+
+def write(writer: BatchWriter, first_row: int, rows):
+    frame, errors = validate_games_frame(csv_frame(rows, first_row))
+    writer.write(first_row, first_row + len(rows) - 1, frame, errors)
+
+
+def test_failed_batch_does_not_keep_dimension_ids(db, monkeypatch):
+    writer = BatchWriter(db)
+    write_batch = writer.ingest_engine.write_batch
+
+    def failing_write_batch(frame):
+        # Creates the tags of the batch, then fails so its savepoint is rolled back
+        write_batch(frame)
+        raise SQLAlchemyError("forced failure")
+
+    monkeypatch.setattr(writer.ingest_engine, 'write_batch', failing_write_batch)
+    write(writer, 0, [game_row(1, Tags='NewTagA')])
+    monkeypatch.undo()
+    # Reuses the id NewTagA had before the rollback
+    write(writer, 1, [game_row(2, Tags='OtherTag')])
+    write(writer, 2, [game_row(3, Tags='NewTagA')])
+
+    assert writer.failure_count == 1
+    assert tag_names(db, 2) == ['OtherTag']
+    assert tag_names(db, 3) == ['NewTagA']
+
+
+def test_stored_errors_are_capped(db, monkeypatch):
+    monkeypatch.setattr(settings, 'INGEST_MAX_ERRORS', 3)
+    writer = BatchWriter(db)
+    write(writer, 0, [game_row(app_id, Name=None) for app_id in range(5)])
+    write(writer, 5, [game_row(app_id, Name=None) for app_id in range(5, 10)] + [game_row(10)])
+
+    assert writer.failure_count == 10
+    assert writer.success_count == 1
+    assert list(writer.result()['errors']) == ['0', '1', '2']
+
+
+def test_dataset_version_only_changes_with_the_data(db):
+    rows = [game_row(1, Tags='Indie'), game_row(2, Tags='Action')]
+    write(BatchWriter(db, incremental=True), 0, rows)
+    version = get_dataset_version(db)
+
+    # Unchanged reloads keep the cached query results valid
+    write(BatchWriter(db, incremental=True), 0, rows)
+    write(BatchWriter(db), 0, rows)
+    assert get_dataset_version(db) == version
+
+    # Full mode keeps the columns of existing games but adds their new associations
+    write(BatchWriter(db), 0, [game_row(1, Tags='Indie,Strategy')])
+    assert get_dataset_version(db) == version + 1
+    write(BatchWriter(db, incremental=True), 0, [game_row(2, Tags='Action', Price='1.99')])
+    assert get_dataset_version(db) == version + 2
+
+
+def test_row_without_price_does_not_fail_its_batch(db):
+    writer = BatchWriter(db)
+    write(writer, 0, [game_row(1), game_row(2, Price=None), game_row(3)])
+
+    assert (writer.success_count, writer.failure_count) == (3, 0)
+    assert db.execute(select(Game.price).where(Game.app_id == 2)).scalar_one() == 0
+
+
+def test_batches_do_not_route_reads_to_the_primary(db, monkeypatch):
+    # Reads of the whole process would skip the replica for as long as an ingest runs
+    monkeypatch.setattr(session, 'last_write_at', None)
+    write(BatchWriter(db), 0, [game_row(1)])
+
+    assert not session.reads_use_primary()
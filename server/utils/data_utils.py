@@ -0,0 +1,179 @@
+import ast
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+# Comma separated dimension columns in the CSV and the key they are exposed under
+DIMENSION_COLUMNS = {
+    'developers': 'Developers',
+    'publishers': 'Publishers',
+    'categories': 'Categories',
+    'genres': 'Genres',
+    'tags': 'Tags',
+}
+LANGUAGES_COLUMN = 'Supported languages'
+
+RELEASE_DATE_FORMATS = ('%b %d, %Y', '%Y-%m-%d')
+
+GAME_COLUMNS = [
+    'app_id', 'name', 'release_date', 'required_age', 'price', 'dlc_count', 'about_the_game',
+    'windows', 'mac', 'linux', 'positive', 'negative', 'score_rank',
+]
+
+CSV_COLUMNS = [
+    'AppID', 'Name', 'Release date', 'Required age', 'Price', 'DLC count', 'About the game',
+    'Windows', 'Mac', 'Linux', 'Positive', 'Negative', 'Score rank', LANGUAGES_COLUMN,
+    *DIMENSION_COLUMNS.values(),
+]
+
+# games.app_id is a 32 bit integer column
+APP_ID_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+# Plain integer literals that fit into int64, parsed in bulk
+INTEGER_PATTERN = r'[ \t]*[+-]?[0-9]{1,18}[ \t]*'
+
+
+def safe_int(value, default=None):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def safe_float(value, default=0.0):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def parse_date(value):
+    for date_format in RELEASE_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+def to_int_column(values: pd.Series, default=None) -> pd.Series:
+    # Same results as safe_int(): values the pattern rejects, e.g. '1_000', are left to int()
+    plain = values.str.fullmatch(INTEGER_PATTERN, na=False)
+    parsed = pd.Series([default] * len(values), index=values.index, dtype=object)
+    parsed[plain] = pd.to_numeric(values[plain]).astype(object)
+    other = values.notna() & ~plain
+    parsed[other] = values[other].map(lambda value: safe_int(value, default)).astype(object)
+    return parsed
+
+
+def to_float_column(values: pd.Series, default: float = 0.0) -> pd.Series:
+    # Same results as safe_float(): missing values stay NaN, values to_numeric rejects are left to float()
+    parsed = pd.to_numeric(values, errors='coerce')
+    other = values.notna() & parsed.isna()
+    parsed[other] = values[other].map(lambda value: safe_float(value, default))
+    return parsed.astype('float64')
+
+
+def to_bool_column(values: pd.Series) -> pd.Series:
+    return values.fillna('').str.strip().str.upper().eq('TRUE')
+
+
+def to_date_column(values: pd.Series) -> pd.Series:
+    # datetime.date objects rather than datetime64, which can't hold dates before 1677 or after 2262
+    parsed = {value: parse_date(value) for value in values.dropna().unique()}
+    return values.map(lambda value: parsed.get(value) if pd.notna(value) else None).astype(object)
+
+
+def split_names(value) -> List[str]:
+    if pd.isna(value) or not value.strip():
+        return []
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_languages(value) -> List[str]:
+    if pd.isna(value) or not value.strip():
+        return []
+    try:
+        languages = ast.literal_eval(value)
+        if not isinstance(languages, list):
+            languages = [str(languages)]
+    except (ValueError, SyntaxError):
+        languages = [value.strip()]
+    return [str(language).strip() for language in languages if str(language).strip()]
+
+
+def map_unique(values: pd.Series, parser) -> pd.Series:
+    # Dimension columns repeat heavily, so parse every distinct value only once
+    parsed = {value: parser(value) for value in values.dropna().unique()}
+    return values.map(lambda value: parsed.get(value, []) if pd.notna(value) else [])
+
+
+def hash_rows(frame: pd.DataFrame) -> pd.Series:
+    """Content hash of every game row including its dimension names, used to skip unchanged rows."""
+    combined = frame['app_id'].astype(str)
+    for column in GAME_COLUMNS[1:]:
+        combined = combined + '\x1f' + frame[column].astype(str)
+    for key in [*DIMENSION_COLUMNS, 'languages']:
+        # Association sets are unordered, so are their names in the hash
+        combined = combined + '\x1f' + frame[key].map(lambda names: '\x1e'.join(sorted(set(names))))
+    return combined.map(lambda value: hashlib.md5(value.encode()).hexdigest())
+
+
+def validate_games_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Validate a raw CSV frame column by column.
+
+    Returns a frame holding only the valid rows as typed columns (plus the parsed
+    dimension name lists) indexed by original row number, and the per-row errors.
+    """
+    df = df.reindex(columns=df.columns.union(CSV_COLUMNS, sort=False)).astype(object)
+
+    app_id = to_int_column(df['AppID'])
+    release_date = to_date_column(df['Release date'])
+
+    # Checks are applied in reverse priority so the first failing check wins
+    messages = pd.Series(None, index=df.index, dtype=object)
+    invalid_date = df['Release date'].notna() & release_date.isna()
+    messages[invalid_date] = 'Invalid date format for release date: ' + df.loc[invalid_date, 'Release date']
+    messages[df['Release date'].isna()] = 'Release date is missing'
+    messages[df['Name'].isna()] = 'Name is missing'
+    # int() takes any size, values the column cannot store would fail the whole batch
+    app_id_valid = app_id.map(lambda value: pd.notna(value) and APP_ID_RANGE[0] <= value <= APP_ID_RANGE[1])
+    messages[~app_id_valid.astype(bool)] = 'AppID is missing or invalid'
+
+    errors = {str(index): message for index, message in messages.dropna().items()}
+    valid = messages.isna()
+    rows = df[valid]
+
+    frame = pd.DataFrame({
+        'app_id': app_id[valid].astype('int64'),
+        'name': rows['Name'],
+        'release_date': release_date[valid],
+        'required_age': to_int_column(rows['Required age'], 0),
+        # games.price is NOT NULL, a missing price is 0 like an unparsable one
+        'price': to_float_column(rows['Price']).fillna(0.0),
+        'dlc_count': to_int_column(rows['DLC count'], 0),
+        'about_the_game': rows['About the game'].fillna(''),
+        'windows': to_bool_column(rows['Windows']),
+        'mac': to_bool_column(rows['Mac']),
+        'linux': to_bool_column(rows['Linux']),
+        'positive': to_int_column(rows['Positive'], 0),
+        'negative': to_int_column(rows['Negative'], 0),
+        'score_rank': to_int_column(rows['Score rank']),
+    }, index=rows.index)
+
+    for key, column in DIMENSION_COLUMNS.items():
+        frame[key] = map_unique(rows[column], split_names)
+    frame['languages'] = map_unique(rows[LANGUAGES_COLUMN], parse_languages)
+    frame['row_hash'] = hash_rows(frame)
+
+    return frame, errors
+
+
+def frame_to_records(frame: pd.DataFrame) -> List[dict]:
+    # Plain python values for the database drivers (no numpy scalars or NA)
+    games = frame[[*GAME_COLUMNS, 'row_hash']].astype(object)
+    games = games.where(games.notna(), None)
+    return games.to_dict('records')
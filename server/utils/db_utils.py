@@ -0,0 +1,32 @@
+from typing import Iterator, Sequence
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Keeps IN lists and multi-row VALUES below the bind parameter limits of the drivers
+IN_CLAUSE_CHUNK_SIZE = 5000
+
+
+def is_postgresql(bind) -> bool:
+    return bind.dialect.name == 'postgresql'
+
+
+def explain_plan(db, statement, analyze: bool = False) -> dict:
+    """PostgreSQL plan of a statement as EXPLAIN (FORMAT JSON) returns it, the root node is under 'Plan'."""
+    compiled = statement.compile(dialect=db.bind.dialect, compile_kwargs={'render_postcompile': True})
+    options = 'ANALYZE, FORMAT JSON' if analyze else 'FORMAT JSON'
+    params = compiled.params
+    if compiled.positional:
+        # e.g. asyncpg (numeric_dollar), its driver takes the values in placeholder order
+        params = tuple(params[name] for name in compiled.positiontup)
+    return db.connection().exec_driver_sql(f"EXPLAIN ({options}) {compiled}", params).scalar()[0]
+
+
+def dialect_insert(bind, table):
+    # INSERT construct supporting ON CONFLICT, SQLite is only used for local development
+    if bind.dialect.name == 'sqlite':
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+
+def chunked(values: Sequence, size: int = IN_CLAUSE_CHUNK_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
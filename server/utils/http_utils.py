@@ -0,0 +1,14 @@
+import hashlib
+from typing import Optional
+
+
+def make_etag(version: int, key: str) -> str:
+    # Changes with every dataset version, so it stays valid until an ingest commits
+    return f'"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
@@ -0,0 +1,21 @@
+import json
+from datetime import date
+from typing import Any
+
+# Optional, several times faster on large pages. Both encoders produce the same compact UTF-8 JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), allow_nan=False, default=_default).encode()
@@ -1,9 +1,10 @@
-from sqlalchemy.orm import Query
-from sqlalchemy import or_
+import base64
+import json
+from sqlalchemy import or_, select, Select
 from typing import List
 from server.models import game_models
 
-def apply_platform_filters(query: Query, platforms: List[str]) -> Query:
+def apply_platform_filters(query: Select, platforms: List[str]) -> Select:
     platform_filters = []
     for platform in platforms:
         if platform == 'windows':
@@ -12,8 +13,25 @@ def apply_platform_filters(query: Query, platforms: List[str]) -> Query:
             platform_filters.append(game_models.Game.mac == True)
         elif platform == 'linux':
             platform_filters.append(game_models.Game.linux == True)
-    return query.filter(or_(*platform_filters))
+    return query.where(or_(*platform_filters))
 
-def apply_multi_value_filters(query: Query, relationship_field, values: List[str], model_field) -> Query:
+def apply_multi_value_filters(query: Select, relationship_field, values: List[str], model_field) -> Select:
     filters = [relationship_field.any(model_field.ilike(f'%{value}%')) for value in values]
-    return query.filter(or_(*filters))
+    return query.where(or_(*filters))
+
+def matching_dimension_ids(values: List[str], model_field) -> Select:
+    return select(model_field.class_.id).where(or_(*[model_field.ilike(f'%{value}%') for value in values]))
+
+def encode_cursor(values: dict) -> str:
+    # Opaque to clients, url safe base64 of the JSON encoded position
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values